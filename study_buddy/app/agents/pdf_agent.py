@@ -9,8 +9,12 @@ from agno.storage.sqlite import SqliteStorage
 from agno.vectordb.lancedb import LanceDb, SearchType
 
 from config.llm_config import get_llm, get_embedding_model
+from app.ingestion.cache import ingestion_key
+from app.ingestion.pdf_reader import open_pdf
 from app.utils.logger import logger
 
+FINGERPRINT_PATH = Path("data/lancedb/pdf_docs.fingerprint")
+
 
 class PdfAgent:
     def __init__(
@@ -21,10 +25,18 @@ class PdfAgent:
         self.urls = urls or []
         self.local_pdfs = local_pdfs
 
-        self._clear_vector_data()
-
         self.llm = get_llm()
         self.embedder = get_embedding_model()
+
+        # A byte-identical local PDF that is already in LanceDB is reused as-is
+        self.fingerprint = self._fingerprint()
+        self.reuse_vectors = (
+            self.fingerprint is not None
+            and FINGERPRINT_PATH.exists()
+            and FINGERPRINT_PATH.read_text() == self.fingerprint
+        )
+        self._clear_vector_data()
+
         self.vector_db = LanceDb(
             uri="data/lancedb",
             table_name="pdf_docs",
@@ -39,14 +51,23 @@ class PdfAgent:
         self.knowledge = self._build_knowledge()
         self.agent = self._build_agent()
 
+    def _fingerprint(self) -> Optional[str]:
+        """Content hash of the local PDF plus embedder, or None for remote PDFs"""
+        if not self.local_pdfs or not self.urls:
+            return None
+        with open_pdf(self.urls[0]) as buffer:
+            return ingestion_key(buffer, embedder=self.embedder.id, table="pdf_docs")
+
     def _clear_vector_data(self):
-        """Delete LanceDB and optionally SQLite storage before building new agent"""
+        """Delete LanceDB (unless reused) and SQLite storage before building new agent"""
         lance_path = Path("data/lancedb/pdf_docs")
         sqlite_path = Path("data/pdf_agent.db")
 
-        if lance_path.exists():
-            logger.info("Clearing vector DB at %s", lance_path)
-            shutil.rmtree(lance_path)
+        if not self.reuse_vectors:
+            if lance_path.exists():
+                logger.info("Clearing vector DB at %s", lance_path)
+                shutil.rmtree(lance_path)
+            FINGERPRINT_PATH.unlink(missing_ok=True)
 
         if sqlite_path.exists():
             logger.info("Deleting session DB at %s", sqlite_path)
@@ -72,7 +93,12 @@ class PdfAgent:
             )
 
     def _build_agent(self) -> Agent:
-        self.knowledge.load(recreate=True)
+        if self.reuse_vectors and self.vector_db.exists():
+            logger.info("PDF unchanged since last build, reusing existing vectors")
+        else:
+            self.knowledge.load(recreate=True)
+            if self.fingerprint is not None:
+                FINGERPRINT_PATH.write_text(self.fingerprint)
 
         agent_config = {
             "name": "Study Buddy",
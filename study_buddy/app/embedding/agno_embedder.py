@@ -0,0 +1,39 @@
+"""agno embedder backed by the shared embedding cache and query batcher."""
+import threading
+from typing import List
+
+import numpy as np
+from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
+
+from app.embedding.batcher import EmbeddingBatcher
+from app.embedding.embedding_cache import get_embedding_cache
+
+_batcher_lock = threading.Lock()
+
+
+class CachedSentenceTransformerEmbedder(SentenceTransformerEmbedder):
+    """
+    SentenceTransformerEmbedder that only encodes texts it has not seen before.
+
+    Uncached texts go through an EmbeddingBatcher, so concurrent knowledge
+    searches share one model call.
+    """
+
+    def get_embedding(self, text) -> List[float]:
+        if not isinstance(text, str):
+            return super().get_embedding(text)
+
+        batcher = self._batcher()
+        cache = get_embedding_cache(self.id, normalize=bool(getattr(self, "normalize_embeddings", False)))
+        if cache is None:
+            return batcher.embed(text).tolist()
+        return cache.embed([text], lambda texts: [batcher.embed(t) for t in texts])[0].tolist()
+
+    def _batcher(self) -> EmbeddingBatcher:
+        with _batcher_lock:
+            batcher = getattr(self, "_query_batcher", None)
+            if batcher is None:
+                batcher = self._query_batcher = EmbeddingBatcher(
+                    lambda texts: np.asarray(SentenceTransformerEmbedder.get_embedding(self, texts))
+                )
+            return batcher
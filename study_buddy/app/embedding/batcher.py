@@ -0,0 +1,101 @@
+"""
+Micro-batching of concurrent single-text embedding requests.
+
+Callers submit one text each and wait on a future; a background thread
+collects pending requests into one batch, encodes it with a single model
+call and hands every caller its own row. A lone caller is encoded right
+away. Once requests are seen to overlap (the previous batch held more than
+one text), the thread keeps collecting for up to `window_ms` or `max_batch`
+texts before encoding, trading a few milliseconds of latency for much
+larger batches under load.
+"""
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List
+
+import numpy as np
+
+from app.utils.logger import logger
+from config.settings import EMBED_BATCH_MAX_SIZE, EMBED_BATCH_WINDOW_MS
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    def __init__(self, encode: Callable[[List[str]], np.ndarray],
+                 max_batch: int = EMBED_BATCH_MAX_SIZE, window_ms: float = EMBED_BATCH_WINDOW_MS):
+        """
+        Args:
+            encode (Callable): Embeds a list of texts, returning one row per text.
+            max_batch (int): Most texts encoded together.
+            window_ms (float): How long to wait for more texts under load.
+        """
+        self.encode = encode
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000
+        self._queue = queue.Queue()
+        self._concurrent = False
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        """Queue `text` for embedding; the future resolves to its vector."""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding of `text`, blocking until its batch has been encoded."""
+        return self.submit(text).result()
+
+    async def embed_async(self, text: str) -> np.ndarray:
+        """`embed` for async callers; does not block the event loop."""
+        return await asyncio.wrap_future(self.submit(text))
+
+    def close(self):
+        """Encode whatever is pending and stop the background thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    if self._concurrent:
+                        item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._concurrent = len(batch) > 1
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = self.encode(texts)
+            if len(vectors) != len(texts):
+                raise RuntimeError(f"Embedding failed for a batch of {len(texts)} texts")
+        except Exception as e:
+            logger.error(f"Batched embedding failed: {e}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
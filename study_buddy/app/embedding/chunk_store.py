@@ -0,0 +1,168 @@
+"""
+Append-only, memory-mapped string store for chunk texts (and chunk keys).
+
+A store at `path` is two files:
+
+    <path>.bin   UTF-8 text of every entry, back to back
+    <path>.idx   uint64 end offset of every entry in .bin
+
+Appends only write the new entries, and readers memory-map both files, so
+opening a store costs nothing and a lookup touches only the entry it
+returns. Entries are written to .bin before their offsets are written to
+.idx, so after a crash the store simply ends at the last complete append.
+"""
+import mmap
+import os
+import time
+from typing import Iterable, Iterator, List
+
+import numpy as np
+
+_ENCODING = "utf-8"
+_ERRORS = "surrogatepass"  # PDF text can contain lone surrogates
+# Attempts by `pin` to catch the store outside a `rewrite`
+_PIN_ATTEMPTS = 100
+
+
+class ChunkStore:
+    def __init__(self, path: str):
+        self.blob_path = f"{path}.bin"
+        self.offsets_path = f"{path}.idx"
+        self._tmp_path = f"{path}.tmp"
+        self._length = os.path.getsize(self.offsets_path) // 8 if os.path.exists(self.offsets_path) else 0
+        self._blob = None
+        self._offsets = None
+        self._mapped = 0  # entries visible through the current mappings
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(f"{path}.idx")
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError("chunk index out of range")
+        if i >= self._mapped:
+            self._map()
+        start = int(self._offsets[i - 1]) if i else 0
+        return self._blob[start:int(self._offsets[i])].decode(_ENCODING, _ERRORS)
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._length):
+            yield self[i]
+
+    def _end(self) -> int:
+        """Byte length of the blob covered by the committed offsets."""
+        if not self._length:
+            return 0
+        with open(self.offsets_path, "rb") as f:
+            f.seek((self._length - 1) * 8)
+            return int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+
+    def _map(self):
+        # Older mappings are dropped rather than closed so concurrent readers
+        # holding them keep working
+        if not self._length:
+            return
+        with open(self.blob_path, "rb") as f:
+            self._blob = _mmap(f)
+        self._offsets = np.memmap(self.offsets_path, dtype=np.uint64, mode="r", shape=(self._length,))
+        self._mapped = self._length
+
+    def pin(self) -> "ChunkStore":
+        """
+        Map the store now and keep serving exactly its current entries, even
+        if it is appended to or rewritten afterwards (a rewrite replaces the
+        files, and the mappings keep the old ones alive).
+
+        `rewrite` renames the new .bin and then the new .idx into place, so
+        the pair is opened, and checked to be the pair the paths name outside
+        that window, before anything is mapped.
+
+        Returns:
+            ChunkStore: This store.
+        """
+        tmp = ChunkStore(self._tmp_path)
+        for _ in range(_PIN_ATTEMPTS):
+            with open(self.blob_path, "rb") as blob, open(self.offsets_path, "rb") as offsets:
+                mid_rename = os.path.exists(tmp.offsets_path) and not os.path.exists(tmp.blob_path)
+                if not mid_rename and _same_file(blob, self.blob_path) and _same_file(offsets, self.offsets_path):
+                    length = os.fstat(offsets.fileno()).st_size // 8
+                    self._blob = _mmap(blob)
+                    self._offsets = np.frombuffer(_mmap(offsets), dtype=np.uint64, count=length)
+                    self._length = self._mapped = length
+                    return self
+            time.sleep(0.01)
+        raise RuntimeError(f"Chunk store {self.blob_path} kept changing while it was opened")
+
+    def append(self, texts: List[str]):
+        if not texts:
+            return
+        encoded = [text.encode(_ENCODING, _ERRORS) for text in texts]
+        start = self._end()
+        ends = np.cumsum([len(b) for b in encoded], dtype=np.uint64) + np.uint64(start)
+
+        mode = "r+b" if os.path.exists(self.blob_path) else "wb"
+        with open(self.blob_path, mode) as f:
+            f.seek(start)
+            f.write(b"".join(encoded))
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        mode = "r+b" if os.path.exists(self.offsets_path) else "wb"
+        with open(self.offsets_path, mode) as f:
+            f.seek(self._length * 8)
+            f.write(ends.tobytes())
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        self._length += len(texts)
+
+    def truncate(self, length: int):
+        """Drop every entry from position `length` on."""
+        if length >= self._length:
+            return
+        self._length = length
+        with open(self.offsets_path, "r+b") as f:
+            f.truncate(length * 8)
+        with open(self.blob_path, "r+b") as f:
+            f.truncate(self._end())
+        self._mapped = min(self._mapped, length)
+
+    def rewrite(self, texts: Iterable[str]):
+        """Replace the whole store with `texts` (used to compact after removals)."""
+        tmp = ChunkStore(self._tmp_path)
+        for path in (tmp.blob_path, tmp.offsets_path):
+            if os.path.exists(path):
+                os.remove(path)
+        batch = []
+        for text in texts:
+            batch.append(text)
+            if len(batch) >= 10_000:
+                tmp.append(batch)
+                batch = []
+        tmp.append(batch)
+        if not len(tmp):
+            for path in (tmp.blob_path, tmp.offsets_path):
+                open(path, "wb").close()
+        os.replace(tmp.blob_path, self.blob_path)
+        os.replace(tmp.offsets_path, self.offsets_path)
+        self._length = len(tmp)
+        self._mapped = 0
+
+
+def _same_file(f, path: str) -> bool:
+    """Whether the open file `f` is (still) the file at `path`."""
+    try:
+        return os.path.samestat(os.fstat(f.fileno()), os.stat(path))
+    except FileNotFoundError:
+        return False
+
+
+def _mmap(f):
+    """Read-only mapping of an open file (b"" if it is empty, which mmap rejects)."""
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
@@ -1,17 +1,101 @@
-from sentence_transformers import SentenceTransformer
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
 import numpy as np
 import logging
 
-# Initialize the model only once (use device='cpu' explicitly)
-model = SentenceTransformer('all-MiniLM-L6-v2', device='cpu')
+from app.embedding.batcher import EmbeddingBatcher
+from app.embedding.embedding_cache import get_embedding_cache
+from app.embedding.model_registry import get_sentence_transformer
+from config.settings import EMBED_BATCH_TOKENS, EMBED_QUANTIZE, EMBED_WORKERS
+
+MODEL_ID = 'all-MiniLM-L6-v2'
+
+# Identifies the vectors this module produces; caches are keyed on it so
+# quantized and fp32 embeddings never mix
+EMBEDDING_ID = f"{MODEL_ID}-int8" if EMBED_QUANTIZE else MODEL_ID
+
+# Longer inputs are silently truncated by the model (256 tokens for MiniLM).
+# Kept as a constant so chunking settings are known without loading the model.
+MAX_SEQ_TOKENS = 256
+
+# Fewer texts than this are not worth sending to more than one worker process
+_MIN_SHARD_SIZE = 32
+
+_model = None
+_model_lock = threading.Lock()
+_query_batcher = None
+_pool = None
+_pool_workers = 0
+
+
+def get_model():
+    """
+    Return the shared SentenceTransformer, loading it on first use.
+
+    Importing this module stays cheap; torch and the model weights are only
+    loaded by the first caller that actually needs embeddings or tokens. The
+    instance comes from the process-wide model registry, so agents using the
+    same model on the CPU share it.
+    """
+    global _model
+    if _model is None:
+        # use device='cpu' explicitly
+        model = get_sentence_transformer(MODEL_ID, device='cpu', quantize=EMBED_QUANTIZE)
+        model.max_seq_length = MAX_SEQ_TOKENS
+        _model = model
+    return _model
+
+
+def warm_up():
+    """Load the model and run one tiny encode so the first request is not slow."""
+    get_model().encode(["warm up"], show_progress_bar=False)
+
+
+def __getattr__(name):
+    # Keep `from app.embedding.embedder import model` working without an eager load
+    if name == "model":
+        return get_model()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def embed_text(texts, batch_size=32):
+
+def count_tokens(text):
+    """Number of model tokens in `text`, including special tokens."""
+    return len(get_model().tokenizer(text, add_special_tokens=True, verbose=False)["input_ids"])
+
+def embed_text(texts, batch_size=None):
     """
     Embeds a list of text chunks efficiently on CPU.
 
+    Texts embedded before (by any process sharing the embedding cache) are
+    served from the cache without touching the model. The rest are sorted by
+    token length and batched by padded token count (EMBED_BATCH_TOKENS), so
+    short texts share large batches instead of being padded to long ones.
+
     Args:
         texts (List[str]): List of strings to embed.
-        batch_size (int): Batch size for faster embedding on CPU.
+        batch_size (int): Optional cap on the number of texts per batch.
+
+    Returns:
+        np.ndarray: Embeddings as a numpy array.
+    """
+    if not texts:
+        return np.array([])
+
+    return _embed_cached(texts, lambda batch: _encode(batch, batch_size))
+
+
+def embed_queries(texts):
+    """
+    Embeds query texts like `embed_text`, but keeps new embeddings in the
+    in-memory cache tier only: one-off questions would otherwise grow the
+    on-disk cache (and every process's index of it) without bound.
+
+    Args:
+        texts (List[str]): Queries to embed.
 
     Returns:
         np.ndarray: Embeddings as a numpy array.
@@ -19,14 +103,143 @@ def embed_text(texts, batch_size=32):
     if not texts:
         return np.array([])
 
+    return _embed_cached(texts, _encode, disk=False)
+
+
+def embed_bulk(texts, workers=None, batch_size=None):
+    """
+    Embeds a large list of chunks, sharded across worker processes.
+
+    Each worker process holds its own copy of the model and a share of the
+    CPU cores; shards are contiguous, so results come back in input order.
+    With a single worker this is just `embed_text`.
+
+    Args:
+        texts (List[str]): List of strings to embed.
+        workers (int): Worker processes; defaults to EMBED_WORKERS.
+        batch_size (int): Optional cap on the number of texts per batch.
+
+    Returns:
+        np.ndarray: Embeddings as a numpy array (empty on failure).
+    """
+    workers = EMBED_WORKERS if workers is None else workers
+    if workers <= 1:
+        return embed_text(texts, batch_size)
+    if not texts:
+        return np.array([])
+
+    def encode(batch):
+        shards = _shards(batch, workers)
+        return np.concatenate(list(_get_pool(workers).map(_encode, shards, repeat(batch_size))))
+
+    return _embed_cached(texts, encode)
+
+
+def _embed_cached(texts, encode, disk=True):
     try:
-        return model.encode(
-            texts,
-            batch_size=batch_size,
+        cache = get_embedding_cache(EMBEDDING_ID, normalize=True)
+        return cache.embed(texts, encode, disk=disk) if cache else encode(texts)
+    except Exception as e:
+        logging.exception("Embedding failed")
+        return np.array([])
+
+
+def token_lengths(texts):
+    """Model tokens per text as encoded (truncated to the model's sequence length)."""
+    model = get_model()
+    return [len(ids) for ids in model.tokenizer(
+        texts, add_special_tokens=True, truncation=True, max_length=model.max_seq_length, verbose=False,
+    )["input_ids"]]
+
+
+def _encode(texts, batch_size=None):
+    model = get_model()
+    lengths = token_lengths(texts)
+
+    embeddings = None
+    for batch in _token_batches(lengths, EMBED_BATCH_TOKENS, batch_size):
+        vectors = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
             show_progress_bar=False,
             convert_to_numpy=True,
             normalize_embeddings=True  # Optional: speeds up cosine similarity
         )
-    except Exception as e:
-        logging.exception("Embedding failed")
-        return np.array([])
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=vectors.dtype)
+        embeddings[batch] = vectors
+    return embeddings
+
+
+def _token_batches(lengths, budget, max_items=None):
+    """
+    Group text positions shortest first into batches of at most `budget`
+    padded tokens (batch size times its longest text) and `max_items` texts.
+    A text longer than the budget gets a batch of its own.
+    """
+    batch = []
+    for i in np.argsort(lengths, kind="stable").tolist():
+        # Positions arrive in ascending length, so text i is the batch's longest
+        if batch and ((len(batch) + 1) * lengths[i] > budget or len(batch) == max_items):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def _shards(texts, workers, min_size=_MIN_SHARD_SIZE):
+    """Split `texts` into at most `workers` contiguous shards of at least `min_size` texts."""
+    count = min(workers, -(-len(texts) // min_size))
+    size = -(-len(texts) // count)
+    return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _model_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown()
+            # spawn rather than fork: torch's thread pools do not survive a fork
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(max(1, (os.cpu_count() or 1) // workers),),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def _init_worker(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    get_model()
+
+
+def get_query_batcher():
+    """Shared EmbeddingBatcher over `embed_queries` for single-query lookups."""
+    global _query_batcher
+    if _query_batcher is None:
+        with _model_lock:
+            if _query_batcher is None:
+                _query_batcher = EmbeddingBatcher(embed_queries)
+    return _query_batcher
+
+
+def embed_query(text):
+    """
+    Embeds a single query, coalescing it with concurrent queries into one batch.
+
+    Args:
+        text (str): Query to embed.
+
+    Returns:
+        np.ndarray: The query embedding.
+
+    Raises:
+        RuntimeError: If the embedding fails.
+    """
+    return get_query_batcher().embed(text)
@@ -0,0 +1,204 @@
+"""
+Content-hash-keyed cache of text embeddings.
+
+A cache belongs to one (model id, normalization) pair, so vectors from
+different models or normalization settings never mix. Lookups go through
+two tiers:
+
+    memory   LRU of the most recently used vectors (EMBED_CACHE_LRU_SIZE)
+    disk     <EMBED_CACHE_DIR>/<model>-<norm|raw>/entries.bin, an append-only
+             file of fixed-size records (20-byte BLAKE2 digest of the text
+             followed by its float32 vector), memory-mapped for reads
+
+Records are appended with a single write, so a crash can at most leave a
+partial last record. Readers ignore it; writers append under an exclusive
+file lock (where the platform has one), so a partial record seen by a writer
+is such a leftover and is cut off before appending. Appends made by other
+processes are picked up on the next miss. Queries use the memory tier only
+(`disk=False`), so the disk tier (and the key -> row index each process
+builds of it) grows with the indexed corpus, not with traffic.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from config.settings import EMBED_CACHE_DIR, EMBED_CACHE_ENABLED, EMBED_CACHE_LRU_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialized
+    fcntl = None
+
+_KEY_BYTES = 20
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=_KEY_BYTES).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_id: str, normalize: bool, directory: str = EMBED_CACHE_DIR,
+                 lru_size: int = EMBED_CACHE_LRU_SIZE):
+        name = re.sub(r"[^\w.-]", "_", model_id) + ("-norm" if normalize else "-raw")
+        self.directory = os.path.join(directory, name)
+        self.entries_path = os.path.join(self.directory, "entries.bin")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.model_id = model_id
+        self.normalize = normalize
+        self.lru_size = lru_size
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._rows: Dict[bytes, int] = {}
+        self._records = None  # read-only memmap of entries.bin
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self._set_dim(json.load(f)["dim"])
+
+    def embed(self, texts: Sequence[str], encode: Callable[[List[str]], np.ndarray],
+              disk: bool = True) -> np.ndarray:
+        """
+        Embeddings of `texts`, calling `encode` only for texts not cached yet.
+
+        Args:
+            texts (Sequence[str]): Texts to embed.
+            encode (Callable): Embeds a list of texts, returning one row per text.
+            disk (bool): Use the disk tier; without it one-off texts (queries)
+                are only looked up in and added to the memory tier.
+
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dim).
+        """
+        keys = [text_key(text) for text in texts]
+        vectors = self.get_many(keys, disk=disk)
+
+        missing: Dict[bytes, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            encoded = np.asarray(encode(list(missing.values())), dtype=np.float32)
+            if len(encoded) != len(missing):
+                raise RuntimeError(f"Encoder returned {len(encoded)} embeddings for {len(missing)} texts")
+            if disk:
+                self.put_many(list(missing), encoded)
+            else:
+                with self._lock:
+                    for key, vector in zip(missing, encoded):
+                        self._remember(key, vector)
+            fresh = dict(zip(missing, encoded))
+            vectors = [fresh[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+
+        if not vectors:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return np.stack(vectors)
+
+    def get_many(self, keys: Sequence[bytes], disk: bool = True) -> List[Optional[np.ndarray]]:
+        """Cached vector for each key, or None where it is not cached."""
+        with self._lock:
+            found = [self._get(key) for key in keys]
+            if disk and any(vector is None for vector in found) and self._sync():
+                found = [self._get(key) if vector is None else vector for key, vector in zip(keys, found)]
+            hits = sum(vector is not None for vector in found)
+            self.hits += hits
+            self.misses += len(found) - hits
+        return found
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        """Store `vectors` (one row per key) in both tiers."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(keys):
+            return
+        with self._lock:
+            if self.dim is None:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp_path = f"{self.meta_path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump({"model": self.model_id, "normalize": self.normalize,
+                               "dim": int(vectors.shape[1])}, f)
+                os.replace(tmp_path, self.meta_path)
+                self._set_dim(int(vectors.shape[1]))
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional embeddings, got {vectors.shape[1]}")
+
+            records = np.empty(len(keys), dtype=self._dtype)
+            records["key"] = np.frombuffer(b"".join(keys), dtype=f"V{_KEY_BYTES}")
+            records["vector"] = vectors
+            with open(self.entries_path, "ab") as f:
+                if fcntl is not None:
+                    # Released when the file is closed
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                # No other writer holds the lock, so a partial record was left by
+                # a crashed one; drop it before appending
+                size = f.seek(0, os.SEEK_END)
+                if size % self._dtype.itemsize:
+                    f.truncate(size - size % self._dtype.itemsize)
+                f.write(records.tobytes())
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+
+    def _set_dim(self, dim: int):
+        self.dim = dim
+        self._dtype = np.dtype([("key", f"V{_KEY_BYTES}"), ("vector", "<f4", (dim,))])
+
+    def _get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            return vector
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        vector = np.array(self._records[row]["vector"])
+        self._remember(key, vector)
+        return vector
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    def _sync(self) -> bool:
+        """Index records appended since the last sync; True if there were any."""
+        if self.dim is None:
+            if not os.path.exists(self.meta_path):
+                return False
+            with open(self.meta_path) as f:
+                self._set_dim(json.load(f)["dim"])
+        try:
+            count = os.path.getsize(self.entries_path) // self._dtype.itemsize
+        except FileNotFoundError:
+            return False
+        known = 0 if self._records is None else len(self._records)
+        if count <= known:
+            return False
+
+        self._records = np.memmap(self.entries_path, dtype=self._dtype, mode="r", shape=(count,))
+        # Void keys convert to bytes in a single pass
+        self._rows.update(zip(self._records["key"][known:].tolist(), range(known, count)))
+        return True
+
+
+_caches: Dict[tuple, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_id: str, normalize: bool) -> Optional[EmbeddingCache]:
+    """Shared cache for a model and normalization setting, or None when disabled."""
+    if not EMBED_CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        key = (model_id, normalize)
+        if key not in _caches:
+            _caches[key] = EmbeddingCache(model_id, normalize)
+        return _caches[key]
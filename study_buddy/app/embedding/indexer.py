@@ -1,48 +1,444 @@
 import os
 import uuid
 import numpy as np
-from config.settings import VECTOR_DB
+from app.embedding.chunk_store import ChunkStore
+from app.embedding.embedder import embed_bulk
+from app.embedding.manifest import read_manifest, write_manifest
+from app.embedding.tombstones import clear_tombstones, file_identity, read_tombstones, write_tombstones
+from app.embedding.vector_log import VectorLog
+from app.utils.logger import logger
+from config.settings import (
+    EMBED_BULK_BATCH_SIZE, FAISS_INDEX_TYPE, HNSW_M, INDEX_CHECKPOINT_VECTORS, IVF_NLIST, VECTOR_DB,
+    VECTOR_PCA_DIM, VECTOR_PRECISION,
+)
 
 FAISS_INDEX_PATH = "data/faiss/index.bin"
-CHUNKS_PATH = "data/faiss/chunks.npy"
+FAISS_LOG_PATH = "data/faiss/index.log"
+FAISS_MANIFEST_PATH = "data/faiss/manifest.json"
+TOMBSTONES_PATH = "data/faiss/removed"
+CHUNK_STORE_PATH = "data/faiss/chunks"
+KEY_STORE_PATH = "data/faiss/keys"
 CHROMA_PATH = "data/chroma"
 
+# Pre chunk-store files, migrated on first start
+LEGACY_CHUNKS_PATH = "data/faiss/chunks.npy"
+LEGACY_KEYS_PATH = "data/faiss/keys.npy"
+
+# FAISS index factory string per storage precision. float16 halves and int8
+# quarters vector memory; both search directly on the compressed codes.
+INDEX_FACTORY = {"float32": "Flat", "float16": "SQfp16", "int8": "SQ8"}
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+# Most vectors sampled to train int8 scales, PCA and IVF centroids in `rebuild_index`
+TRAIN_SAMPLE_SIZE = 65536
+# FAISS wants about this many training vectors per IVF list
+IVF_POINTS_PER_LIST = 39
+# Vectors reconstructed at a time when rebuilding an index without some rows
+REBUILD_BATCH_SIZE = 65536
+
+if VECTOR_PRECISION not in INDEX_FACTORY:
+    raise ValueError(f"Invalid VECTOR_PRECISION: {VECTOR_PRECISION}")
+if FAISS_INDEX_TYPE not in INDEX_TYPES:
+    raise ValueError(f"Invalid FAISS_INDEX_TYPE: {FAISS_INDEX_TYPE}")
+
 if VECTOR_DB == "chroma":
     import chromadb
     chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
     collection = chroma_client.get_or_create_collection("notes")
+    if VECTOR_PRECISION != "float32" or VECTOR_PCA_DIM or FAISS_INDEX_TYPE != "flat":
+        logger.warning("VECTOR_PRECISION, VECTOR_PCA_DIM and FAISS_INDEX_TYPE only apply to the "
+                       "FAISS store; Chroma uses its own HNSW index over float32 vectors")
 else:
     import faiss
     dimension = 384  # depends on embedding model
-    index = faiss.IndexFlatL2(dimension)
-    all_chunks = []
+    # Chunk texts and per-chunk keys ("<doc_id>:<page_hash>", or "" for
+    # anonymous chunks) in append-only stores, row-aligned with the index
+    chunk_store = ChunkStore(CHUNK_STORE_PATH)
+    key_store = ChunkStore(KEY_STORE_PATH)
+    # Vectors added since index.bin was last written
+    vector_log = VectorLog(FAISS_LOG_PATH)
+    # index.ntotal as of the last checkpoint
+    checkpointed = 0
+    # Positions removed since the last checkpoint (see tombstones.py)
+    removed = set()
+    # key -> positions of its chunks, built on the first removal
+    key_positions = None
+    # Bumped in the manifest on every change, so retrievers reload
+    generation = read_manifest(FAISS_MANIFEST_PATH).get("generation", 0)
+
+
+def _new_index(pca_dim=0, index_type="flat", nlist=IVF_NLIST):
+    """
+    Empty FAISS index storing vectors at VECTOR_PRECISION.
+
+    `index_type` is "flat" (exact search), "hnsw" (graph with HNSW_M links
+    per node) or "ivf" (`nlist` k-means lists, trained on a corpus sample).
+    With `pca_dim`, vectors (stored and query) are first projected onto their
+    top `pca_dim` principal components. The projection is part of the index
+    file and is fitted when the index is trained.
+    """
+    storage = INDEX_FACTORY[VECTOR_PRECISION]
+    if index_type == "hnsw":
+        description = f"HNSW{HNSW_M}" if storage == "Flat" else f"HNSW{HNSW_M}_{storage}"
+    elif index_type == "ivf":
+        description = f"IVF{nlist},{storage}"
+    else:
+        description = storage
+    if pca_dim:
+        description = f"PCA{pca_dim},{description}"
+    return faiss.index_factory(dimension, description)
+
+
+def _base(idx):
+    """The index behind an optional PCA pre-transform."""
+    return faiss.downcast_index(idx.index) if isinstance(idx, faiss.IndexPreTransform) else idx
 
 
-def index_text_chunks(chunks, embeddings):
-    """Index text chunks and embeddings into the selected vector store."""
+def index_type(idx) -> str:
+    """Search structure of a FAISS index: "flat", "hnsw" or "ivf"."""
+    base = _base(idx)
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if faiss.try_extract_index_ivf(base) is not None:
+        return "ivf"
+    return "flat"
+
+
+def index_pca_dim(idx) -> int:
+    """Output dimension of the index's PCA projection, or 0 without one."""
+    return idx.index.d if isinstance(idx, faiss.IndexPreTransform) else 0
+
+
+def index_precision(idx) -> str:
+    """Storage precision of a FAISS index: "float32", "float16" or "int8"."""
+    idx = _base(idx)
+    if isinstance(idx, faiss.IndexHNSW):
+        idx = faiss.downcast_index(idx.storage)
+    if isinstance(idx, (faiss.IndexScalarQuantizer, faiss.IndexIVFScalarQuantizer)):
+        qtypes = {faiss.ScalarQuantizer.QT_fp16: "float16", faiss.ScalarQuantizer.QT_8bit: "int8"}
+        return qtypes.get(idx.sq.qtype, "unknown")
+    return "float32"
+
+
+def _train(idx, embeddings):
+    """
+    Train `idx` (int8 per-dimension scales) if it needs it.
+
+    Random unit vectors are added to the training set so that a small first
+    batch still yields usable value ranges; `rebuild_index` retrains on a
+    sample of the whole corpus.
+    """
+    if idx.is_trained:
+        return
+    prior = np.random.default_rng(0).standard_normal((1024, idx.d)).astype(np.float32)
+    prior /= np.linalg.norm(prior, axis=1, keepdims=True)
+    idx.train(np.vstack([np.asarray(embeddings, dtype=np.float32), prior]))
+
+
+def _load_faiss_store():
+    """Continue from the persisted store so new chunks are added to it."""
+    global index, checkpointed, removed
+    if not os.path.exists(FAISS_INDEX_PATH):
+        return
+    index = faiss.read_index(FAISS_INDEX_PATH)
+    checkpointed = index.ntotal
+    tombstones = read_tombstones(TOMBSTONES_PATH)
+    if tombstones is not None and tombstones[0] != file_identity(FAISS_INDEX_PATH):
+        # A checkpoint wrote index.bin without these rows but stopped before
+        # clearing the log and tombstones, which describe the old index.bin
+        vector_log.clear()
+        clear_tombstones(TOMBSTONES_PATH)
+        tombstones = None
+    replayed = vector_log.replay(index)
+    if vector_log.repair():
+        logger.warning("Dropped an incomplete record from the FAISS index log")
+    if replayed:
+        logger.info(f"Replayed {replayed} vectors from the FAISS index log")
+    if index_precision(index) != VECTOR_PRECISION:
+        logger.warning(f"FAISS index stores {index_precision(index)} vectors but VECTOR_PRECISION is "
+                       f"{VECTOR_PRECISION}; run `rebuild-index` to convert it")
+    if index_pca_dim(index) != VECTOR_PCA_DIM:
+        logger.warning(f"FAISS index has PCA dimension {index_pca_dim(index)} but VECTOR_PCA_DIM is "
+                       f"{VECTOR_PCA_DIM}; run `rebuild-index` to refit it")
+    if index_type(index) != FAISS_INDEX_TYPE:
+        logger.warning(f"FAISS index is {index_type(index)} but FAISS_INDEX_TYPE is {FAISS_INDEX_TYPE}; "
+                       f"run `rebuild-index` to migrate it")
+
+    if not ChunkStore.exists(CHUNK_STORE_PATH) and os.path.exists(LEGACY_CHUNKS_PATH):
+        chunks = np.load(LEGACY_CHUNKS_PATH, allow_pickle=True).tolist()
+        keys = np.load(LEGACY_KEYS_PATH).tolist() if os.path.exists(LEGACY_KEYS_PATH) else [""] * len(chunks)
+        chunk_store.rewrite(chunks)
+        key_store.rewrite(keys)
+        os.remove(LEGACY_CHUNKS_PATH)
+        if os.path.exists(LEGACY_KEYS_PATH):
+            os.remove(LEGACY_KEYS_PATH)
+
+    if tombstones is not None:
+        removed = {int(i) for i in tombstones[1] if i < index.ntotal}
+        if removed and len(chunk_store) < index.ntotal:
+            # A checkpoint compacted the stores but stopped before index.bin
+            logger.warning("Finishing an interrupted FAISS checkpoint")
+            _compact(stores=False)
+            save_index()
+
+    # Stores are appended before the vectors are logged; drop rows the index
+    # never got (e.g. after a crash in between)
+    chunk_store.truncate(index.ntotal)
+    key_store.truncate(index.ntotal)
+
+
+def index_text_chunks(chunks, embeddings, keys=None):
+    """
+    Index text chunks and embeddings into the selected vector store.
+
+    Args:
+        chunks (List[str]): Chunk texts.
+        embeddings (np.ndarray): One embedding per chunk.
+        keys (List[str]): Optional per-chunk keys used by `remove_chunks`.
+    """
     if VECTOR_DB == "chroma":
         ids = [str(uuid.uuid4()) for _ in chunks]
+        metadatas = [{"key": key} for key in keys] if keys is not None else None
         # chroma expects python lists, not numpy arrays
-        collection.add(documents=chunks, embeddings=[e.tolist() for e in embeddings], ids=ids)
+        collection.add(documents=chunks, embeddings=[e.tolist() for e in embeddings], ids=ids,
+                       metadatas=metadatas)
     else:
-        global all_chunks
-        index.add(np.array(embeddings))
-        all_chunks.extend(chunks)
-        save_index()
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        _train(index, embeddings)
+        # Only the new chunks and vectors are written; index.bin is rewritten
+        # at checkpoints, and always exists once anything was indexed
+        keys = list(keys) if keys is not None else [""] * len(chunks)
+        if key_positions is not None:
+            for position, key in enumerate(keys, start=len(key_store)):
+                if key:
+                    key_positions.setdefault(key, []).append(position)
+        chunk_store.append(list(chunks))
+        key_store.append(keys)
+        if os.path.exists(FAISS_INDEX_PATH):
+            vector_log.append(index.ntotal, embeddings)
+        index.add(embeddings)
+        if not os.path.exists(FAISS_INDEX_PATH) or index.ntotal - checkpointed >= INDEX_CHECKPOINT_VECTORS:
+            save_index()
+        else:
+            _publish()
+
+
+def remove_chunks(keys):
+    """
+    Remove every chunk whose key is in `keys` from the vector store.
+
+    FAISS rows are only marked as removed (tombstones), which retrievers
+    filter out of search results; they are dropped from the index and the
+    chunk stores at the next checkpoint, or once INDEX_CHECKPOINT_VECTORS
+    rows are marked.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    if VECTOR_DB == "chroma":
+        collection.delete(where={"key": {"$in": sorted(keys)}})
+        return
+
+    global key_positions
+    if key_positions is None:
+        key_positions = {}
+        for position, key in enumerate(key_store):
+            if key:
+                key_positions.setdefault(key, []).append(position)
+    positions = {i for key in keys for i in key_positions.pop(key, ())}
+    if not positions:
+        return
+    removed.update(positions)
+    if len(removed) >= INDEX_CHECKPOINT_VECTORS:
+        save_index()  # keep the set that searches filter small
+        return
+    write_tombstones(TOMBSTONES_PATH, FAISS_INDEX_PATH, removed)
+    _publish()
+
+
+def _compact(vectors=True, stores=True):
+    """
+    Drop the removed positions from the in-memory index and/or the chunk
+    stores; later rows move up, so tombstones and key positions are reset.
+    """
+    global index, removed, key_positions
+    if vectors:
+        if isinstance(_base(index), faiss.IndexFlatCodes):
+            # Flat indexes compact on removal, so positions stay aligned with
+            # the stores once the same positions are dropped from them
+            index.remove_ids(np.array(sorted(removed), dtype=np.int64))
+        elif faiss.try_extract_index_ivf(index) is not None:
+            _remove_from_ivf(index, removed)
+        else:
+            index = _without(index, removed)
+    if stores:
+        kept = [i for i in range(len(chunk_store)) if i not in removed]
+        chunk_store.rewrite(chunk_store[i] for i in kept)
+        key_store.rewrite(key_store[i] for i in kept)
+    removed = set()
+    key_positions = None
+
+
+def _remove_from_ivf(idx, removed):
+    """
+    Drop the vectors at positions `removed` from an IVF index in place.
+
+    IVF lists keep the ids of the vectors that remain, which leaves gaps; the
+    ids are shifted down past the removed positions, so they stay aligned
+    with the chunk stores and new vectors continue at `ntotal`.
+    """
+    removed = np.array(sorted(removed), dtype=np.int64)
+    idx.remove_ids(removed)
+    ivf = faiss.try_extract_index_ivf(idx)
+    for list_no in range(ivf.nlist):
+        size = ivf.invlists.list_size(list_no)
+        if size:
+            ids = faiss.rev_swig_ptr(ivf.invlists.get_ids(list_no), size)
+            ids -= np.searchsorted(removed, ids)
+
+
+def _without(idx, removed):
+    """
+    Copy of HNSW index `idx` without the vectors at positions `removed`.
+
+    HNSW graphs cannot drop nodes, so the kept vectors are reconstructed
+    into an emptied clone, which keeps the trained parts (PCA, int8 scales).
+    This re-inserts every kept vector into the graph.
+    """
+    fresh = faiss.clone_index(idx)
+    fresh.reset()
+
+    removed = np.fromiter(removed, dtype=np.int64)
+    for start in range(0, idx.ntotal, REBUILD_BATCH_SIZE):
+        count = min(REBUILD_BATCH_SIZE, idx.ntotal - start)
+        keep = ~np.isin(np.arange(start, start + count), removed)
+        fresh.add(idx.reconstruct_n(start, count)[keep])
+    return fresh
 
 
 def save_index():
+    """
+    Write the whole in-memory index to index.bin, dropping removed rows, and
+    empty the vector log.
+    """
+    global checkpointed
     if VECTOR_DB == "chroma":
         # chroma persistent client saves automatically
         return
-    faiss.write_index(index, FAISS_INDEX_PATH)
-    np.save(CHUNKS_PATH, np.array(all_chunks))
+    if removed:
+        # Stores first: a retriever seeing fewer chunks than vectors keeps
+        # its snapshot, and a restart can tell the index still needs it
+        _compact()
+    # Write next to the index and rename, so readers never see a partial file
+    tmp_path = f"{FAISS_INDEX_PATH}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, FAISS_INDEX_PATH)
+    # Log records are keyed by position, so a crash before this line only
+    # leaves records that replay skips (or, after a compaction, records that
+    # the mismatched tombstones tell the next start to discard)
+    vector_log.clear()
+    clear_tombstones(TOMBSTONES_PATH)
+    checkpointed = index.ntotal
+    _publish()
+
+
+def _publish():
+    """Announce a new generation of the store to retrievers."""
+    global generation
+    generation += 1
+    write_manifest(FAISS_MANIFEST_PATH, generation=generation, vectors=index.ntotal)
+
+
+def checkpoint() -> int:
+    """
+    Compact the vector log and removed rows into index.bin, if there are any.
+
+    Returns:
+        int: Number of vectors that were only in the log.
+    """
+    if VECTOR_DB == "chroma":
+        return 0
+    pending = index.ntotal - checkpointed
+    if pending or vector_log.size() or removed:
+        save_index()
+    return pending
+
+
+def rebuild_index() -> int:
+    """
+    Re-create the FAISS index from the chunk store with the configured
+    FAISS_INDEX_TYPE, VECTOR_PRECISION and VECTOR_PCA_DIM.
+
+    Chunks are re-embedded (mostly from the embedding cache), so an index can
+    be converted between types and precisions without compounding
+    quantization error. int8 scales, IVF centroids and the PCA projection
+    are fitted on a sample of the whole corpus; the number of IVF lists is
+    capped so every list gets enough training vectors.
+
+    Returns:
+        int: Number of vectors in the rebuilt index.
+    """
+    global index
+    if VECTOR_DB == "chroma":
+        raise RuntimeError("rebuild_index only supports the FAISS store")
+    if removed:
+        _compact(vectors=False)  # the index is rebuilt from the stores
+
+    def embed(positions):
+        embeddings = embed_bulk([chunk_store[i] for i in positions])
+        if len(embeddings) != len(positions):
+            raise RuntimeError("Embedding failed; see log for details")
+        return embeddings
+
+    total = len(chunk_store)
+    pca_dim = VECTOR_PCA_DIM
+    if pca_dim and total < pca_dim:
+        logger.warning(f"Only {total} chunks; need at least {pca_dim} to fit PCA, building without it")
+        pca_dim = 0
+    kind, nlist, sample = FAISS_INDEX_TYPE, IVF_NLIST, None
+    if total and not _new_index(pca_dim, kind, 1).is_trained:
+        step = max(1, total // TRAIN_SAMPLE_SIZE)
+        sample = embed(range(0, total, step)[:TRAIN_SAMPLE_SIZE])
+        if kind == "ivf":
+            nlist = min(IVF_NLIST, max(1, len(sample) // IVF_POINTS_PER_LIST))
+            if nlist < IVF_NLIST:
+                logger.info(f"Using {nlist} IVF lists for {len(sample)} training vectors")
+    elif kind == "ivf":
+        kind = "flat"  # nothing to train IVF centroids on yet
+
+    rebuilt = _new_index(pca_dim, kind, nlist)
+    if sample is not None:
+        if pca_dim or kind == "ivf":
+            # Real vectors only: the random prior would distort the
+            # principal components and the k-means centroids
+            rebuilt.train(sample)
+        else:
+            _train(rebuilt, sample)
+        if pca_dim:
+            # Only the fitted projection is used from here on; drop the full
+            # eigenvector matrix so it is not written into the index file
+            faiss.downcast_VectorTransform(rebuilt.chain.at(0)).PCAMat.clear()
+    for start in range(0, total, EMBED_BULK_BATCH_SIZE):
+        rebuilt.add(embed(range(start, min(start + EMBED_BULK_BATCH_SIZE, total))))
+        logger.info(f"Re-indexed {rebuilt.ntotal}/{total} chunks...")
+
+    index = rebuilt
+    save_index()
+    return total
 
 
 def load_index():
     if VECTOR_DB == "chroma":
         return collection
-    global index
+    global index, checkpointed
     if os.path.exists(FAISS_INDEX_PATH):
         index = faiss.read_index(FAISS_INDEX_PATH)
+        checkpointed = index.ntotal
+        vector_log.replay(index)
     return index
+
+
+if VECTOR_DB != "chroma":
+    # IVF centroids need a corpus sample, so an IVF index is only ever built
+    # by `rebuild_index`; until then new stores start as flat indexes
+    index = _new_index(index_type="flat" if FAISS_INDEX_TYPE == "ivf" else FAISS_INDEX_TYPE)
+    _load_faiss_store()
@@ -0,0 +1,25 @@
+"""
+Manifest of the FAISS store (data/faiss/manifest.json).
+
+The indexer rewrites it, by atomic rename, after every change to the store
+with an increasing `generation`; readers compare generations to notice new
+content without re-reading the index itself.
+"""
+import json
+import os
+
+
+def read_manifest(path: str) -> dict:
+    """The manifest's fields, or an empty dict if there is none (yet)."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(path: str, **fields):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(fields, f)
+    os.replace(tmp_path, path)
@@ -0,0 +1,76 @@
+"""
+Process-wide registry of loaded sentence-transformer models.
+
+Every consumer (the embedder, the agno embedders of all agents) asks the
+registry for its model, so each (model, device, quantization) combination
+is loaded once per process. Models are handed out wrapped in SharedModel,
+which serializes encode and tokenizer calls: HuggingFace fast tokenizers
+fail when used from several threads at once, and concurrent encodes
+would only compete for the same cores anyway.
+"""
+import threading
+from typing import Dict, Tuple
+
+
+class _LockedTokenizer:
+    def __init__(self, tokenizer, lock):
+        self._tokenizer = tokenizer
+        self._lock = lock
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self._tokenizer(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._tokenizer, name)
+
+
+class SharedModel:
+    """Thread-safe facade over a SentenceTransformer shared by many callers."""
+
+    def __init__(self, model):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_lock", threading.RLock())
+
+    def encode(self, *args, **kwargs):
+        with self._lock:
+            return self._model.encode(*args, **kwargs)
+
+    @property
+    def tokenizer(self):
+        return _LockedTokenizer(self._model.tokenizer, self._lock)
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._model, name, value)
+
+
+_models: Dict[Tuple[str, str, bool], SharedModel] = {}
+_lock = threading.Lock()
+
+
+def get_sentence_transformer(model_id: str, device: str = "cpu", quantize: bool = False) -> SharedModel:
+    """
+    Return the process-wide instance of a sentence-transformer, loading it once.
+
+    Args:
+        model_id (str): Model name or path.
+        device (str): torch device to load the model on.
+        quantize (bool): Use int8 dynamically quantized linear layers (CPU only).
+
+    Returns:
+        SharedModel: The shared, thread-safe model.
+    """
+    key = (model_id, device, quantize)
+    with _lock:
+        if key not in _models:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(model_id, device=device)
+            if quantize:
+                from app.embedding.quantization import quantize_model
+                model = quantize_model(model)
+            _models[key] = SharedModel(model)
+        return _models[key]
@@ -0,0 +1,70 @@
+"""
+Helpers for choosing the PCA dimension of the FAISS index (VECTOR_PCA_DIM).
+
+The projection itself lives inside the index (a FAISS PCAMatrix pre-transform
+fitted by `rebuild_index`); these functions only measure, on a sample of
+embeddings, what a given output dimension would retain.
+"""
+from typing import List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+CANDIDATE_DIMS = (16, 32, 48, 64, 96, 128, 192, 256, 384)
+
+
+class PcaOption(NamedTuple):
+    dim: int
+    variance: float  # fraction of total variance retained
+    recall: float    # recall@k of nearest neighbours vs. full-dimension search
+
+
+def pca_report(vectors: np.ndarray, dims: Sequence[int] = CANDIDATE_DIMS, k: int = 10,
+               queries: int = 200) -> List[PcaOption]:
+    """
+    Retained variance and neighbour recall for each candidate dimension.
+
+    Args:
+        vectors (np.ndarray): Sample embeddings, shape (n, d).
+        dims (Sequence[int]): Output dimensions to evaluate (capped at min(n, d)).
+        k (int): Neighbours compared for recall.
+        queries (int): Sample rows used as queries.
+
+    Returns:
+        List[PcaOption]: One entry per evaluated dimension, smallest first.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    mean = vectors.mean(axis=0)
+    _, singular, components = np.linalg.svd(vectors - mean, full_matrices=False)
+    cumulative = np.cumsum(singular ** 2) / np.sum(singular ** 2)
+
+    queries = min(queries, len(vectors))
+    k = min(k, len(vectors) - 1)
+    truth = _neighbours(vectors, queries, k)
+
+    report = []
+    for dim in sorted({min(d, len(cumulative)) for d in dims}):
+        projected = (vectors - mean) @ components[:dim].T
+        found = _neighbours(projected, queries, k)
+        recall = np.mean([len(set(a) & set(b)) / k for a, b in zip(truth, found)]) if k else 1.0
+        report.append(PcaOption(dim, float(cumulative[dim - 1]), float(recall)))
+    return report
+
+
+def pick_dim(report: List[PcaOption], variance: Optional[float] = None,
+             recall: Optional[float] = None) -> Optional[int]:
+    """Smallest dimension in `report` meeting the variance and/or recall targets."""
+    for option in report:
+        if (variance is None or option.variance >= variance) and (recall is None or option.recall >= recall):
+            return option.dim
+    return None
+
+
+def _neighbours(vectors, queries, k):
+    """Indices of the k nearest other rows (L2) for each of the first `queries` rows."""
+    distances = (
+        np.sum(vectors[:queries] ** 2, axis=1)[:, None]
+        - 2 * vectors[:queries] @ vectors.T
+        + np.sum(vectors ** 2, axis=1)[None, :]
+    )
+    distances[np.arange(queries), np.arange(queries)] = np.inf  # skip the query itself
+    return np.argsort(distances, axis=1)[:, :k]
@@ -0,0 +1,88 @@
+"""
+Dynamic int8 quantization of the sentence-transformer for CPU inference.
+
+The weights of every nn.Linear layer are stored as int8 and activations are
+quantized on the fly, which roughly halves CPU encode time for MiniLM-sized
+models at a small cost in embedding fidelity. `check_agreement` measures
+that cost against the fp32 model.
+"""
+import copy
+import time
+from typing import List, NamedTuple
+
+import numpy as np
+
+# Used by `check_agreement` when there are no indexed chunks to sample
+SAMPLE_TEXTS = [
+    "Photosynthesis converts light energy into chemical energy stored in glucose.",
+    "The derivative of a function measures how its output changes with its input.",
+    "In 1789 the French Revolution began with the storming of the Bastille.",
+    "A hash table maps keys to values using a hash function to pick a bucket.",
+    "Supply and demand determine the equilibrium price in a competitive market.",
+    "Mitochondria are the site of cellular respiration in eukaryotic cells.",
+    "Newton's second law states that force equals mass times acceleration.",
+    "A binary search halves the remaining range at every comparison.",
+]
+
+
+class AgreementReport(NamedTuple):
+    samples: int
+    mean_cosine: float
+    min_cosine: float
+    fp32_seconds: float
+    int8_seconds: float
+
+    @property
+    def speedup(self) -> float:
+        return self.fp32_seconds / self.int8_seconds if self.int8_seconds else 0.0
+
+
+def quantize_model(model):
+    """
+    Return an int8 dynamically quantized copy of a CPU SentenceTransformer.
+
+    Args:
+        model (SentenceTransformer): fp32 model on the CPU.
+
+    Returns:
+        SentenceTransformer: The quantized model.
+    """
+    import torch
+
+    # fbgemm needs x86; ARM CPUs (e.g. Apple silicon) only have qnnpack
+    if "fbgemm" not in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = "qnnpack"
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def check_agreement(texts: List[str], reference, quantized) -> AgreementReport:
+    """
+    Compare the quantized model's embeddings with the fp32 model's.
+
+    Args:
+        texts (List[str]): Sample texts to embed with both models.
+        reference (SentenceTransformer): fp32 model.
+        quantized (SentenceTransformer): Model returned by `quantize_model`.
+
+    Returns:
+        AgreementReport: Per-text cosine similarity summary and encode timings.
+    """
+    def encode(model):
+        started = time.perf_counter()
+        vectors = model.encode(texts, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True)
+        return vectors, time.perf_counter() - started
+
+    # Warm both models so the timings compare steady-state encoding
+    reference.encode(texts[:1], show_progress_bar=False)
+    quantized.encode(texts[:1], show_progress_bar=False)
+    fp32, fp32_seconds = encode(reference)
+    int8, int8_seconds = encode(quantized)
+
+    cosine = np.sum(fp32 * int8, axis=1)
+    return AgreementReport(
+        samples=len(texts),
+        mean_cosine=float(cosine.mean()),
+        min_cosine=float(cosine.min()),
+        fp32_seconds=fp32_seconds,
+        int8_seconds=int8_seconds,
+    )
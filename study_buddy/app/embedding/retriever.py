@@ -1,12 +1,27 @@
-from app.embedding.embedder import embed_text
-from config.settings import VECTOR_DB
+from app.embedding.chunk_store import ChunkStore
+from app.embedding.embedder import embed_queries, embed_query
+from app.embedding.manifest import read_manifest
+from app.embedding.tombstones import file_identity, read_tombstones
+from app.embedding.vector_log import VectorLog
+from app.utils.logger import logger
+from config.settings import (
+    HNSW_EF_SEARCH, INDEX_MMAP, INDEX_PREFAULT, INDEX_RELOAD_SECONDS, IVF_NPROBE, VECTOR_DB,
+)
 import os
+import threading
+import time
+from typing import Any, NamedTuple, Optional
 import numpy as np
-from functools import lru_cache
 
 FAISS_INDEX_PATH = "data/faiss/index.bin"
-CHUNKS_PATH = "data/faiss/chunks.npy"
+FAISS_LOG_PATH = "data/faiss/index.log"
+FAISS_MANIFEST_PATH = "data/faiss/manifest.json"
+TOMBSTONES_PATH = "data/faiss/removed"
+CHUNK_STORE_PATH = "data/faiss/chunks"
+LEGACY_CHUNKS_PATH = "data/faiss/chunks.npy"
 CHROMA_PATH = "data/chroma"
+# Bytes read at a time when prefaulting a memory-mapped index
+PREFAULT_BLOCK_SIZE = 16 * 1024 * 1024
 
 if VECTOR_DB == "chroma":
     import chromadb
@@ -22,37 +37,345 @@ else:
     import faiss
 
 
-@lru_cache()
+class Snapshot(NamedTuple):
+    generation: Optional[int]  # manifest generation it was loaded at, None if incomplete
+    index: Any
+    chunks: Any
+
+
+class IndexHandle:
+    """
+    The FAISS index and chunk store as of some generation of the store.
+
+    `get` returns the current snapshot and, at most every `reload_seconds`,
+    compares its generation with the manifest; a newer generation is loaded
+    in a background thread and swapped in once complete. Searches hold on
+    to the snapshot they started with, so a swap never blocks or disturbs
+    them.
+    """
+
+    def __init__(self, reload_seconds: float = INDEX_RELOAD_SECONDS):
+        self.reload_seconds = reload_seconds
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._reloading = False
+        self._checked = 0.0
+
+    def get(self) -> Snapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = _load_snapshot()
+                return self._snapshot
+        if self.reload_seconds > 0 and time.monotonic() - self._checked >= self.reload_seconds:
+            self._checked = time.monotonic()
+            if read_manifest(FAISS_MANIFEST_PATH).get("generation") != snapshot.generation:
+                self._reload_in_background()
+        return snapshot
+
+    def reload(self):
+        """Load the store as it is now and swap it in (blocking)."""
+        current = self._snapshot
+        snapshot = _load_snapshot(current)
+        # Chunk stores are rewritten before the index on removals; a snapshot
+        # caught in between is only used if there is nothing else
+        if current is None or len(snapshot.chunks) >= snapshot.index.ntotal:
+            self._snapshot = snapshot
+            if current is not None:
+                logger.info(f"Reloaded FAISS index ({snapshot.index.ntotal} vectors)")
+
+    def _reload_in_background(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+
+        def run():
+            try:
+                self.reload()
+            except Exception as e:
+                logger.warning(f"Reloading the FAISS index failed: {e}")
+            finally:
+                self._reloading = False
+
+        threading.Thread(target=run, daemon=True).start()
+
+
+def _load_snapshot(previous: Optional[Snapshot] = None) -> Snapshot:
+    manifest = read_manifest(FAISS_MANIFEST_PATH)
+    if not os.path.exists(FAISS_INDEX_PATH):
+        raise RuntimeError("FAISS index not found.")
+    index = None
+    if previous is not None and isinstance(previous.index, LoggedIndex):
+        # Usually only the log grew since the last load (no checkpoint)
+        index = previous.index.extended(FAISS_INDEX_PATH, FAISS_LOG_PATH)
+    if index is None:
+        index = read_index(FAISS_INDEX_PATH, FAISS_LOG_PATH)
+    generation = manifest.get("generation")
+    tombstones = read_tombstones(TOMBSTONES_PATH)
+    if tombstones is not None and tombstones[0] != index.identity:
+        # Written for another index.bin: a checkpoint that drops removed rows
+        # is under way, and the log may belong to either side of it
+        index = LoggedIndex(index.base, index.identity)
+        generation = None
+    elif tombstones is not None:
+        index.exclude(tombstones[1])
+    # Opened after the index, so it holds a row for every vector (the
+    # indexer writes chunks first)
+    chunks = _load_chunk_store()
+    if index.ntotal < manifest.get("vectors", 0) or len(chunks) < index.ntotal:
+        # Loaded while the indexer was mid-checkpoint; load again on the
+        # next check
+        generation = None
+    return Snapshot(generation, index, chunks)
+
+
+class LoggedIndex:
+    """
+    A checkpointed FAISS index plus the vectors logged since the checkpoint.
+
+    The checkpoint (`base`) may be memory-mapped and therefore read-only, so
+    logged vectors go into `tail`, a small in-memory flat index over the
+    same (transformed) vectors. Searches query both and merge the results;
+    tail ids continue after `base.ntotal`, so ids are positions in the store
+    as with a single index. Positions removed since the checkpoint (see
+    `exclude`) are never returned.
+    """
+
+    def __init__(self, base, identity, tail=None, log_inode=None, log_position=0):
+        self.base = base
+        self.identity = identity  # of index.bin when `base` was read
+        self._transform = base.chain.at(0) if isinstance(base, faiss.IndexPreTransform) else None
+        dim = base.index.d if self._transform is not None else base.d
+        self.tail = tail if tail is not None else faiss.IndexFlatL2(dim)
+        self.log_inode = log_inode
+        self.log_position = log_position  # bytes of the log already in `tail`
+        self._selectors = None  # (base, tail) IDSelectors skipping removed positions
+
+    @property
+    def ntotal(self):
+        return self.base.ntotal + self.tail.ntotal
+
+    @property
+    def d(self):
+        return self.base.d
+
+    def _project(self, x):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        return self._transform.apply(x) if self._transform is not None else x
+
+    def add(self, x):
+        self.tail.add(self._project(x))
+
+    def replay(self, log_path):
+        """Add the log's vectors from `log_position` on."""
+        log = VectorLog(log_path)
+        inode = log.inode()
+        if inode != self.log_inode:
+            # A new log file: this index has none of it yet
+            self.log_inode, self.log_position = inode, 0
+        log.replay(self, self.log_position)
+        self.log_position = log.position
+
+    def exclude(self, positions):
+        """Leave `positions` (removed from the store) out of search results."""
+        positions = np.asarray(positions, dtype=np.int64)
+        if not len(positions):
+            self._selectors = None
+            return
+        selectors = []
+        in_tail = positions >= self.base.ntotal
+        for ids in (positions[~in_tail], positions[in_tail] - self.base.ntotal):
+            batch = faiss.IDSelectorBatch(ids)
+            selector = faiss.IDSelectorNot(batch)
+            selector.referenced_objects = [batch]  # keep the wrapped selector alive
+            selectors.append(selector)
+        self._selectors = tuple(selectors)
+
+    def extended(self, path, log_path) -> Optional["LoggedIndex"]:
+        """
+        This index with the records logged since it was loaded, sharing
+        `base`; None if `path` has been checkpointed since, when the index
+        has to be read again.
+        """
+        if not os.path.exists(path) or file_identity(path) != self.identity:
+            return None
+        tail = faiss.clone_index(self.tail) if self.tail.ntotal else None
+        index = LoggedIndex(self.base, self.identity, tail, self.log_inode, self.log_position)
+        index.replay(log_path)
+        # A checkpoint while replaying may have restarted the log under us
+        if file_identity(path) != self.identity:
+            return None
+        return index
+
+    def search(self, x, k, params=None):
+        tail_params = None
+        if self._selectors is not None:
+            params = _with_selector(self.base, params, self._selectors[0])
+            tail_params = faiss.SearchParameters(sel=self._selectors[1])
+        D, I = self.base.search(np.ascontiguousarray(x, dtype=np.float32), k, params=params)
+        if not self.tail.ntotal:
+            return D, I
+        tail_D, tail_I = self.tail.search(self._project(x), k, params=tail_params)
+        I = np.hstack([I, np.where(tail_I >= 0, tail_I + self.base.ntotal, -1)])
+        D = np.hstack([D, tail_D])
+        D[I < 0] = np.inf
+        order = np.argsort(D, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+
+
+def _with_selector(index, params, selector):
+    """`params` (or default parameters) for `index`, restricted to the ids `selector` accepts."""
+    if params is None:
+        params = faiss.SearchParameters()
+        if isinstance(index, faiss.IndexPreTransform):
+            inner = params
+            params = faiss.SearchParametersPreTransform(index_params=inner)
+            params.referenced_objects = [inner]
+    inner = params.index_params if isinstance(params, faiss.SearchParametersPreTransform) else params
+    inner.sel = selector
+    return params
+
+
+def read_index(path, log_path, mmap=INDEX_MMAP, prefault=INDEX_PREFAULT):
+    """
+    Read a FAISS index and the vectors logged since its last checkpoint.
+
+    With `mmap`, the stored vectors stay in the file and are paged in by
+    searches (and shared with other processes reading it) instead of being
+    copied into memory. Logged vectors are kept in a separate in-memory
+    index either way (see LoggedIndex).
+
+    Args:
+        path (str): index.bin to read.
+        log_path (str): Vector log of the index.
+        mmap (bool): Memory-map the index if possible.
+        prefault (bool): Read a mapped file once so searches hit the page cache.
+
+    Returns:
+        LoggedIndex: The index with the logged vectors.
+    """
+    identity = file_identity(path)
+    if mmap:
+        # The indexer replaces index.bin by rename, never in place, so the
+        # mapped file stays intact for as long as this index uses it
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+        base = faiss.read_index(path, flags)
+        if prefault:
+            with open(path, "rb") as f:
+                while f.read(PREFAULT_BLOCK_SIZE):
+                    pass
+    else:
+        base = faiss.read_index(path)
+    index = LoggedIndex(base, identity)
+    # Vectors indexed since the last checkpoint
+    index.replay(log_path)
+    return index
+
+
+def _load_chunk_store():
+    if ChunkStore.exists(CHUNK_STORE_PATH):
+        # Memory-mapped: only chunks that are actually returned get read.
+        # Pinned, so a later rewrite (removal) cannot change what this
+        # snapshot's positions refer to
+        return ChunkStore(CHUNK_STORE_PATH).pin()
+    if os.path.exists(LEGACY_CHUNKS_PATH):
+        return np.load(LEGACY_CHUNKS_PATH, allow_pickle=True).tolist()
+    raise RuntimeError("Chunk store not found.")
+
+
+index_handle = IndexHandle()
+
+
 def load_index():
     if VECTOR_DB == "chroma":
         return get_chroma_collection()
-    if os.path.exists(FAISS_INDEX_PATH):
-        return faiss.read_index(FAISS_INDEX_PATH)
-    raise RuntimeError("FAISS index not found.")
+    return index_handle.get().index
 
 
-@lru_cache()
 def load_chunks():
     if VECTOR_DB == "chroma":
         return get_chroma_collection().get().get("documents", [])
-    if os.path.exists(CHUNKS_PATH):
-        return np.load(CHUNKS_PATH, allow_pickle=True).tolist()
-    raise RuntimeError("Chunk store not found.")
+    return index_handle.get().chunks
+
+
+def search_params(index, ef_search=None, nprobe=None):
+    """
+    Per-query FAISS search parameters: efSearch for HNSW and nprobe for IVF
+    indexes (defaults HNSW_EF_SEARCH / IVF_NPROBE), None for flat indexes.
+    """
+    if isinstance(index, LoggedIndex):
+        index = index.base  # the tail is flat
+    base = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+    if isinstance(base, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(efSearch=ef_search or HNSW_EF_SEARCH)
+    elif faiss.try_extract_index_ivf(base) is not None:
+        params = faiss.SearchParametersIVF(nprobe=nprobe or IVF_NPROBE)
+    else:
+        return None
+    if base is not index:
+        inner = params
+        params = faiss.SearchParametersPreTransform(index_params=inner)
+        params.referenced_objects = [inner]  # keep the wrapped parameters alive
+    return params
+
+
+def retrieve_relevant_chunks(query, top_k=5, ef_search=None, nprobe=None):
+    """
+    Chunks most similar to `query`.
+
+    Args:
+        query (str): Question text.
+        top_k (int): Number of chunks to return.
+        ef_search (int): HNSW search breadth (default HNSW_EF_SEARCH).
+        nprobe (int): IVF lists visited (default IVF_NPROBE).
+
+    Returns:
+        List[str]: Chunk texts, most similar first.
+    """
+    return _search(np.array([embed_query(query)]), top_k, ef_search, nprobe)[0]
+
+
+def retrieve_relevant_chunks_batch(queries, top_k=5, ef_search=None, nprobe=None):
+    """
+    Chunks most similar to each of `queries`, embedded as one batch and
+    looked up with a single multi-row search.
+
+    Args:
+        queries (List[str]): Question texts.
+        top_k (int): Number of chunks to return per query.
+        ef_search (int): HNSW search breadth (default HNSW_EF_SEARCH).
+        nprobe (int): IVF lists visited (default IVF_NPROBE).
+
+    Returns:
+        List[List[str]]: Per query, chunk texts most similar first.
 
+    Raises:
+        RuntimeError: If the embedding fails.
+    """
+    if not queries:
+        return []
+    embeddings = embed_queries(list(queries))
+    if len(embeddings) != len(queries):
+        raise RuntimeError("Embedding failed; see log for details")
+    return _search(embeddings, top_k, ef_search, nprobe)
 
-def retrieve_relevant_chunks(query, top_k=5):
-    query_embedding = embed_text([query])[0]
 
+def _search(query_embeddings, top_k, ef_search, nprobe):
+    """Top `top_k` chunk texts for every row of `query_embeddings`."""
     if VECTOR_DB == "chroma":
         collection = get_chroma_collection()
         results = collection.query(
-            query_embeddings=[query_embedding.tolist()],
+            query_embeddings=query_embeddings.tolist(),
             n_results=top_k
         )
-        docs = results.get("documents", [[]])
-        return docs[0] if docs and docs[0] else []
+        docs = results.get("documents") or [[]] * len(query_embeddings)
+        return [d or [] for d in docs]
 
-    index = load_index()
-    chunks = load_chunks()
-    D, I = index.search(np.array([query_embedding]), top_k)
-    return [chunks[i] for i in I[0] if i < len(chunks)]
+    # One snapshot for the whole search, so index and chunks always match
+    snapshot = index_handle.get()
+    index, chunks = snapshot.index, snapshot.chunks
+    D, I = index.search(np.asarray(query_embeddings, dtype=np.float32), top_k,
+                        params=search_params(index, ef_search, nprobe))
+    return [[chunks[i] for i in row if 0 <= i < len(chunks)] for row in I]
@@ -0,0 +1,57 @@
+"""
+Positions removed from the FAISS store since its last checkpoint
+(data/faiss/removed).
+
+Rewriting the chunk stores and index.bin (and, for HNSW, rebuilding the
+graph) on every removal makes re-ingesting one revised document cost as
+much as the whole corpus. Instead removed positions are recorded here and
+filtered out of searches; the indexer drops the rows when it next
+checkpoints. The file is
+
+    uint64 inode, int64 mtime_ns, uint64 size   index.bin it applies to
+    n * int64                                   removed positions, sorted
+
+A checkpoint that drops rows shifts the positions after them, so readers
+only use tombstones written for the index.bin they loaded.
+"""
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct("<QqQ")
+
+
+def file_identity(path: str) -> Tuple[int, int, int]:
+    """(inode, mtime, size) of a file; changes whenever it is replaced."""
+    st = os.stat(path)
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def read_tombstones(path: str) -> Optional[Tuple[Tuple[int, int, int], np.ndarray]]:
+    """The index.bin identity and removed positions in `path`, or None if there is no file."""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    if len(data) < _HEADER.size:
+        return None  # torn by a crash before the rename; never the live file
+    return _HEADER.unpack_from(data), np.frombuffer(data, dtype=np.int64, offset=_HEADER.size)
+
+
+def write_tombstones(path: str, index_path: str, positions):
+    """Record `positions` as removed from the store whose index is at `index_path`."""
+    positions = np.unique(np.asarray(list(positions), dtype=np.int64))
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(*file_identity(index_path)) + positions.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def clear_tombstones(path: str):
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,115 @@
+"""
+Write-behind log of vectors added to the FAISS index since its last checkpoint.
+
+Rewriting index.bin after every batch makes ingestion cost grow with the
+size of the index. Instead each batch is appended here (and fsynced) and
+index.bin is only rewritten at checkpoints. A record is
+
+    int64 start, int32 count, int32 dim    position of the first vector
+    count * dim float32                     the vectors
+
+Replaying adds the vectors at positions the loaded index does not have yet,
+so records already contained in a checkpoint are skipped. A torn last record
+(crash mid-append) is ignored by readers and cut off by the writer with
+`repair` before it appends again. Readers following a growing log replay
+from the byte offset (`position`) their last replay stopped at.
+"""
+import os
+import struct
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct("<qii")
+
+
+class VectorLog:
+    def __init__(self, path: str):
+        self.path = path
+        # Offset just past the last record read by `replay`
+        self.position = 0
+
+    def __len__(self) -> int:
+        """Number of vectors in the log."""
+        return sum(len(vectors) for _, vectors in self.records())
+
+    def size(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def inode(self) -> Optional[int]:
+        """Identity of the log file; it changes when the log is cleared and restarted."""
+        try:
+            return os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return None
+
+    def append(self, start: int, vectors: np.ndarray):
+        """Durably log `vectors`, which will occupy positions start.. in the index."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with open(self.path, "ab") as f:
+            f.write(_HEADER.pack(start, len(vectors), vectors.shape[1]) + vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def records(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """(start position, vectors) of every complete record."""
+        for start, vectors, _ in self._records():
+            yield start, vectors
+
+    def _records(self, offset: int = 0):
+        """(start, vectors, end offset) of every complete record from byte `offset` on."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        position = 0
+        while position + _HEADER.size <= len(data):
+            start, count, dim = _HEADER.unpack_from(data, position)
+            end = position + _HEADER.size + count * dim * 4
+            if end > len(data):
+                break
+            yield start, np.frombuffer(data, dtype=np.float32, count=count * dim,
+                                       offset=position + _HEADER.size).reshape(count, dim), offset + end
+            position = end
+
+    def repair(self) -> int:
+        """
+        Cut a torn last record off the log, so the next append does not land
+        behind it. Only the (single) writer may call this.
+
+        Returns:
+            int: Number of bytes removed.
+        """
+        size = self.size()
+        complete = 0
+        for _, _, complete in self._records():
+            pass
+        if complete < size:
+            with open(self.path, "r+b") as f:
+                f.truncate(complete)
+                f.flush()
+                os.fsync(f.fileno())
+        return size - complete
+
+    def replay(self, index, offset: int = 0) -> int:
+        """
+        Add logged vectors beyond `index.ntotal` to `index`, reading records
+        from byte `offset` on; returns how many. Afterwards `position` is the
+        offset to continue from.
+        """
+        added = 0
+        self.position = offset
+        for start, vectors, end in self._records(offset):
+            if start > index.ntotal:
+                break  # gap: the log does not continue this index
+            fresh = vectors[index.ntotal - start:]
+            if len(fresh):
+                index.add(fresh)
+                added += len(fresh)
+            self.position = end
+        return added
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
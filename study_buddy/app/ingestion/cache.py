@@ -0,0 +1,147 @@
+"""
+Content-addressed cache for PDF ingestion.
+
+Entries are keyed by the SHA-256 of the PDF bytes plus the chunker and
+embedder settings, so re-uploading a byte-identical document with the same
+settings skips extraction, chunking and embedding entirely. Each entry is a
+directory holding:
+
+    pages.jsonl      extracted page text, one JSON string per line
+    chunks.jsonl     [page_number, chunk_text] per line
+    embeddings.f32   raw float32 embeddings, row-aligned with chunks
+    meta.json        chunk count, embedding dimension, key settings and the
+                     pages each page's dropped duplicate chunks repeated
+
+Entries are written to a temporary directory and renamed into place on
+success, so a crashed, failed or partial (incremental) ingestion never
+leaves an incomplete entry.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+import numpy as np
+
+from config.settings import INGEST_CACHE_DIR, INGEST_CACHE_ENABLED
+
+
+class CachedIngestion(NamedTuple):
+    pages: List[str]        # page text, index 0 is page 1
+    chunk_pages: List[int]  # page number of each chunk
+    chunks: List[str]
+    embeddings: np.ndarray  # read-only memmap, shape (len(chunks), dim)
+    duplicates: Dict[int, List[int]] = {}  # page number -> pages its dropped chunks repeat
+
+
+def file_digest(file_bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def ingestion_key(file_bytes, **params) -> str:
+    """Cache key for a document: hash of its bytes plus the pipeline settings."""
+    return ingestion_key_for_digest(file_digest(file_bytes), **params)
+
+
+def ingestion_key_for_digest(digest: str, **params) -> str:
+    """`ingestion_key` for a document whose `file_digest` is already known."""
+    settings = json.dumps(params, sort_keys=True)
+    return hashlib.sha256(f"{digest}:{settings}".encode()).hexdigest()
+
+
+def load_cached(key: str) -> Optional[CachedIngestion]:
+    """Return the cached chunks and embeddings for `key`, or None on a miss."""
+    entry = os.path.join(INGEST_CACHE_DIR, key)
+    if not INGEST_CACHE_ENABLED or not os.path.isdir(entry):
+        return None
+
+    with open(os.path.join(entry, "meta.json")) as f:
+        meta = json.load(f)
+    if meta.get("dedup") is not None and "duplicates" not in meta:
+        return None  # written before duplicate sources were recorded
+    with open(os.path.join(entry, "pages.jsonl"), encoding="utf-8") as f:
+        pages = [json.loads(line) for line in f]
+    with open(os.path.join(entry, "chunks.jsonl"), encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    chunk_pages = [page for page, _ in records]
+    chunks = [text for _, text in records]
+    duplicates = {int(page): sources for page, sources in meta.get("duplicates", {}).items()}
+
+    if not chunks:
+        return CachedIngestion(pages, chunk_pages, chunks, np.empty((0, meta["dim"]), dtype=np.float32), duplicates)
+    embeddings = np.memmap(
+        os.path.join(entry, "embeddings.f32"), dtype=np.float32, mode="r",
+        shape=(meta["chunks"], meta["dim"]),
+    )
+    return CachedIngestion(pages, chunk_pages, chunks, embeddings, duplicates)
+
+
+class CacheWriter:
+    """
+    Streams one ingestion into a new cache entry.
+
+    Use as a context manager; the entry is published only if the block
+    exits without an exception. When caching is disabled it does nothing.
+    """
+
+    def __init__(self, key: str, **meta):
+        self.key = key
+        self.meta = dict(meta)
+        self.count = 0
+        self.dim = 0
+        self.complete = True
+        self.duplicates = {}  # page number -> pages its dropped chunks repeat
+        self._tmp = os.path.join(INGEST_CACHE_DIR, f".tmp-{key}-{uuid.uuid4().hex}")
+
+    def __enter__(self):
+        if INGEST_CACHE_ENABLED:
+            os.makedirs(self._tmp)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not INGEST_CACHE_ENABLED:
+            return False
+        if exc_type is None and self.complete:
+            self._commit()
+        else:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+        return False
+
+    def record_pages(self, pages: Iterable) -> Iterator:
+        """Pass pages through unchanged while saving their text to the entry."""
+        if not INGEST_CACHE_ENABLED:
+            yield from pages
+            return
+        with open(os.path.join(self._tmp, "pages.jsonl"), "a", encoding="utf-8") as f:
+            for page in pages:
+                f.write(json.dumps(page[1]) + "\n")
+                yield page
+
+    def add(self, chunks: List[str], embeddings: np.ndarray, pages: List[int]):
+        if not INGEST_CACHE_ENABLED:
+            return
+        with open(os.path.join(self._tmp, "chunks.jsonl"), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps([page, chunk]) + "\n" for page, chunk in zip(pages, chunks))
+        with open(os.path.join(self._tmp, "embeddings.f32"), "ab") as f:
+            f.write(np.ascontiguousarray(embeddings, dtype=np.float32).tobytes())
+        self.count += len(chunks)
+        self.dim = embeddings.shape[1]
+
+    def mark_incomplete(self):
+        """Some pages were not embedded (e.g. unchanged pages); don't publish."""
+        self.complete = False
+
+    def _commit(self):
+        for name in ("pages.jsonl", "chunks.jsonl", "embeddings.f32"):
+            open(os.path.join(self._tmp, name), "ab").close()
+        with open(os.path.join(self._tmp, "meta.json"), "w") as f:
+            json.dump({**self.meta, "chunks": self.count, "dim": self.dim, "duplicates": self.duplicates}, f)
+
+        entry = os.path.join(INGEST_CACHE_DIR, self.key)
+        try:
+            os.rename(self._tmp, entry)
+        except OSError:
+            # Another ingestion of the same document won the race
+            shutil.rmtree(self._tmp, ignore_errors=True)
@@ -1,9 +1,134 @@
 # Splits text into chunks
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional
+
+
+class Span(NamedTuple):
+    """A chunk as character offsets into its source text (end exclusive)."""
+    start: int
+    end: int
+    page: int = 0
+
+
+# Preferred places to end a chunk, strongest first
+_BOUNDARIES = (
+    re.compile(r"\n\s*\n"),               # paragraph break
+    re.compile(r"[.!?][\"')\]]*\s+"),     # end of sentence
+    re.compile(r"\n"),                    # line break
+    re.compile(r"\s+"),                   # word break
+)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def chunk_spans(
+        text: str,
+        chunk_size: int = 500,
+        overlap: int = 50,
+        page: int = 0,
+        max_tokens: Optional[int] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+) -> List[Span]:
+    """
+    Splits text into spans of at most `chunk_size` characters.
+
+    Chunk ends are snapped back to the strongest boundary (paragraph,
+    sentence, line, word) found in the second half of the window, and the
+    next chunk starts on a word boundary roughly `overlap` characters
+    earlier. No substrings are created except for token counting.
+
+    Args:
+        text (str): Source text.
+        chunk_size (int): Maximum characters per chunk.
+        overlap (int): Approximate characters shared between chunks.
+        page (int): Page number recorded on every span.
+        max_tokens (int): Optional token budget per chunk, e.g. the embedding
+            model's maximum sequence length, so chunks are never truncated.
+        count_tokens (Callable[[str], int]): Tokenizer used with `max_tokens`.
+
+    Returns:
+        List[Span]: Non-empty, whitespace-trimmed spans in text order.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+
+    spans = []
+    length = len(text)
+    start = _skip_whitespace(text, 0)
+    while start < length:
+        end = _snap_end(text, start, min(start + chunk_size, length))
+        if max_tokens and count_tokens:
+            end = _fit_tokens(text, start, end, max_tokens, count_tokens)
+
+        trimmed = end
+        while trimmed > start and text[trimmed - 1].isspace():
+            trimmed -= 1
+        if trimmed > start:
+            spans.append(Span(start, trimmed, page))
+
+        if end >= length:
+            break
+        start = _snap_start(text, max(end - overlap, start + 1), end)
+    return spans
+
 
 def chunk_text(text, chunk_size=500, overlap=50):
-    # Ensure the overlap is not greater than the chunk size
-    chunks = []
-    for i in range(0, len(text), chunk_size - overlap):
-        chunk = text[i:i + chunk_size]
-        chunks.append(chunk)
-    return chunks
+    return [text[span.start:span.end] for span in chunk_spans(text, chunk_size, overlap)]
+
+
+def chunk_pages(
+        pages: Iterable,
+        chunk_size: int = 500,
+        overlap: int = 50,
+        max_tokens: Optional[int] = None,
+        count_tokens: Optional[Callable[[str], int]] = None,
+) -> Iterator[str]:
+    """
+    Streaming chunker for `(page_number, text)` pairs such as those yielded
+    by `iter_pdf_pages`. Pages are chunked independently, so only the
+    current page is held in memory and every chunk belongs to one page.
+
+    Yields:
+        str: Text chunks in document order.
+    """
+    for page_number, text in pages:
+        for span in chunk_spans(text, chunk_size, overlap, page_number, max_tokens, count_tokens):
+            yield text[span.start:span.end]
+
+
+def _skip_whitespace(text, pos):
+    match = _WHITESPACE.match(text, pos)
+    return match.end() if match else pos
+
+
+def _snap_end(text, start, end):
+    """Move `end` back to the last strong boundary in the second half of the window."""
+    if end >= len(text):
+        return len(text)
+    low = start + (end - start) // 2
+    for pattern in _BOUNDARIES:
+        last = None
+        for last in pattern.finditer(text, low, end):
+            pass
+        if last is not None:
+            return last.end()
+    return end
+
+
+def _snap_start(text, pos, end):
+    """Move `pos` forward to the start of the next word (but not past `end`)."""
+    if not text[pos - 1].isspace():
+        match = _WHITESPACE.search(text, pos, end)
+        pos = match.end() if match else end
+    return _skip_whitespace(text, pos)
+
+
+def _fit_tokens(text, start, end, max_tokens, count_tokens):
+    """Shrink `end` until text[start:end] fits in `max_tokens`."""
+    while end - start > 1:
+        tokens = count_tokens(text[start:end])
+        if tokens <= max_tokens:
+            return end
+        target = start + max(1, int((end - start) * max_tokens / tokens * 0.9))
+        snapped = _snap_end(text, start, target)
+        end = snapped if snapped < end else target
+    return end
@@ -0,0 +1,114 @@
+"""
+Duplicate and near-duplicate chunk elimination, run between chunking and
+embedding so repeated boilerplate, slides and overlaps are never embedded
+or stored.
+
+Exact duplicates are detected with a hash of the whitespace/case-normalised
+text. Near duplicates are detected with MinHash signatures over word
+3-shingles: two chunks are near duplicates when their estimated Jaccard
+similarity is at least `threshold`. Signatures are split into LSH bands so
+only chunks that share a band are ever compared.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from typing import Hashable, List, Optional
+
+import numpy as np
+
+_PERMUTATIONS = 64
+_BAND_ROWS = 4  # 16 bands: chunks with Jaccard >= 0.8 share a band with ~99.9% probability
+
+# Multiply-shift hash family; the seed is fixed so signatures are stable
+_rng = np.random.default_rng(0x5EED)
+_MULTIPLIERS = _rng.integers(1, 2 ** 63, _PERMUTATIONS, dtype=np.uint64) | np.uint64(1)
+_OFFSETS = _rng.integers(0, 2 ** 63, _PERMUTATIONS, dtype=np.uint64)
+
+_WORD = re.compile(r"\w+")
+
+
+def minhash(text: str) -> np.ndarray:
+    """MinHash signature (uint32[64]) of the word 3-shingles of `text`."""
+    words = _WORD.findall(text.lower())
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles)
+    hashes = np.frombuffer(digests, dtype=np.uint64)
+    permuted = (hashes[:, None] * _MULTIPLIERS + _OFFSETS) >> np.uint64(32)
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+class ChunkDeduplicator:
+    """
+    Filters duplicate chunks across every batch passed to `filter`, e.g. a
+    whole document or a whole `upload-dir` run.
+
+    Args:
+        threshold (float): Estimated Jaccard similarity at which a chunk is
+            a near duplicate of an earlier one; None keeps only exact dedup.
+
+    Attributes:
+        exact_dropped (int): Chunks dropped as exact duplicates.
+        near_dropped (int): Chunks dropped as near duplicates.
+        duplicated (set): Owners of the kept chunks that chunks dropped by
+            the last `filter` call duplicated (other than its own owner).
+    """
+
+    def __init__(self, threshold: Optional[float] = 0.8):
+        self.threshold = threshold
+        self._exact = {}  # normalised text digest -> owner
+        self._signatures = []
+        self._owners = []  # owner of each signature
+        self._bands = defaultdict(list)  # (band, band bytes) -> signature positions
+        self.exact_dropped = 0
+        self.near_dropped = 0
+        self.duplicated = set()
+
+    @property
+    def dropped(self) -> int:
+        return self.exact_dropped + self.near_dropped
+
+    def filter(self, chunks: List[str], owner: Hashable = None) -> List[int]:
+        """
+        Return the positions of the chunks in `chunks` worth keeping.
+
+        Args:
+            chunks (List[str]): Chunks to filter.
+            owner (Hashable): What the kept chunks belong to, e.g. their page;
+                reported in `duplicated` when later chunks duplicate them.
+        """
+        kept = []
+        self.duplicated = set()
+        for position, chunk in enumerate(chunks):
+            digest = hashlib.blake2b(" ".join(chunk.lower().split()).encode("utf-8"), digest_size=16).digest()
+            if digest in self._exact:
+                self.exact_dropped += 1
+                self.duplicated.add(self._exact[digest])
+                continue
+            self._exact[digest] = owner
+
+            if self.threshold is not None:
+                signature = minhash(chunk)
+                bands = [
+                    (start, signature[start:start + _BAND_ROWS].tobytes())
+                    for start in range(0, _PERMUTATIONS, _BAND_ROWS)
+                ]
+                match = self._near_duplicate(signature, bands)
+                if match is not None:
+                    self.near_dropped += 1
+                    self.duplicated.add(self._owners[match])
+                    continue
+                for band in bands:
+                    self._bands[band].append(len(self._signatures))
+                self._signatures.append(signature)
+                self._owners.append(owner)
+            kept.append(position)
+        self.duplicated.discard(owner)
+        return kept
+
+    def _near_duplicate(self, signature, bands) -> Optional[int]:
+        """Position of a stored signature similar to `signature`, if any."""
+        candidates = {i for band in bands for i in self._bands.get(band, ())}
+        return next(
+            (i for i in sorted(candidates) if np.mean(self._signatures[i] == signature) >= self.threshold),
+            None,
+        )
@@ -0,0 +1,77 @@
+"""
+Per-document page fingerprints used for incremental re-ingestion.
+
+For every ingested document id the manifest records the content hash of each
+page. Chunks are indexed under the key "<doc_id>:<page_hash>", so when a
+revised version is uploaded only new or changed pages are embedded, and the
+chunks of pages that disappeared can be removed from the vector store.
+
+Deduplication drops chunks of one page that repeat chunks of an earlier page
+of the same document, so the manifest also records, per page, the pages its
+dropped chunks duplicated. When one of those pages goes away, the dependent
+page is indexed again in full (`pages_to_reindex`).
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from config.settings import DOCUMENTS_PATH
+
+
+def page_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def chunk_key(doc_id: str, page_digest: str) -> str:
+    return f"{doc_id}:{page_digest}"
+
+
+def load_manifest() -> Dict[str, dict]:
+    """Manifest entry of every ingested document, keyed by document id."""
+    if not os.path.exists(DOCUMENTS_PATH):
+        return {}
+    with open(DOCUMENTS_PATH) as f:
+        return json.load(f)
+
+
+def document_pages(manifest: dict, doc_id: str) -> List[str]:
+    """Page hashes recorded for `doc_id` in a loaded manifest."""
+    return manifest[doc_id]["pages"] if doc_id in manifest else []
+
+
+def document_duplicates(manifest: dict, doc_id: str) -> Dict[str, List[str]]:
+    """Page hash -> hashes of the pages its dropped duplicate chunks repeat."""
+    return manifest.get(doc_id, {}).get("duplicates", {})
+
+
+def fresh_pages(hashes: List[str], previous: set) -> set:
+    """Page numbers whose content is neither already indexed nor a repeat."""
+    fresh, seen = set(), set(previous)
+    for page_number, digest in enumerate(hashes, start=1):
+        if digest not in seen:
+            fresh.add(page_number)
+            seen.add(digest)
+    return fresh
+
+
+def pages_to_reindex(hashes: List[str], duplicates: Dict[str, List[str]], stale: set) -> set:
+    """Hashes of pages still in the document that relied on a `stale` page's chunks."""
+    present = set(hashes)
+    return {page for page, sources in duplicates.items() if page in present and stale.intersection(sources)}
+
+
+def set_document_pages(doc_id: str, hashes: List[str], duplicates: Optional[Dict[str, List[str]]] = None):
+    update_documents({doc_id: hashes}, {doc_id: duplicates or {}})
+
+
+def update_documents(documents: Dict[str, List[str]], duplicates: Optional[Dict[str, dict]] = None):
+    """Record page hashes (and duplicate sources) for several documents in one manifest write."""
+    manifest = load_manifest()
+    for doc_id, hashes in documents.items():
+        manifest[doc_id] = {"pages": hashes, "duplicates": (duplicates or {}).get(doc_id, {})}
+    os.makedirs(os.path.dirname(DOCUMENTS_PATH) or ".", exist_ok=True)
+    tmp_path = f"{DOCUMENTS_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, DOCUMENTS_PATH)
@@ -0,0 +1,213 @@
+from itertools import batched
+from typing import Dict, List, Optional, Tuple
+
+from app.embedding.embedder import embed_bulk, count_tokens, MAX_SEQ_TOKENS, EMBEDDING_ID
+from app.embedding.indexer import index_text_chunks, remove_chunks
+from app.ingestion.cache import CacheWriter, ingestion_key, load_cached
+from app.ingestion.chunker import chunk_spans
+from app.ingestion.dedup import ChunkDeduplicator
+from app.ingestion.documents import (
+    chunk_key, document_duplicates, document_pages, fresh_pages, load_manifest, page_hash, pages_to_reindex,
+    set_document_pages,
+)
+from app.ingestion.pdf_reader import iter_pdf_pages, open_pdf
+from app.utils.logger import logger
+from config.settings import CHUNK_SIZE, CHUNK_OVERLAP, INGEST_BATCH_SIZE, DEDUP_ENABLED, DEDUP_THRESHOLD
+
+
+def ingestion_settings() -> dict:
+    """Settings that determine chunks and embeddings; part of every cache key."""
+    return dict(
+        chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP, max_tokens=MAX_SEQ_TOKENS, model=EMBEDDING_ID,
+        dedup=DEDUP_THRESHOLD if DEDUP_ENABLED else None,
+    )
+
+
+def chunk_page(text: str, page_number: int):
+    """Chunk one page with the configured chunker settings and token budget."""
+    spans = chunk_spans(text, CHUNK_SIZE, CHUNK_OVERLAP, page_number,
+                        max_tokens=MAX_SEQ_TOKENS, count_tokens=count_tokens)
+    return [text[span.start:span.end] for span in spans]
+
+
+def make_deduplicator() -> Optional[ChunkDeduplicator]:
+    """Per-document duplicate filter, or None when DEDUP_ENABLED is off."""
+    if not DEDUP_ENABLED:
+        return None
+    return ChunkDeduplicator(DEDUP_THRESHOLD or None)
+
+
+def log_dedup(dedup: Optional[ChunkDeduplicator], label: str):
+    if dedup is not None and dedup.dropped:
+        logger.info(f"Dropped {dedup.dropped} duplicate chunks from {label} "
+                    f"({dedup.exact_dropped} exact, {dedup.near_dropped} near)")
+
+
+def ingest_pdf(source, doc_id: Optional[str] = None) -> int:
+    """
+    Extracts, chunks, embeds and indexes a PDF.
+
+    Pages are streamed through the pipeline in INGEST_BATCH_SIZE batches, so
+    only one batch of chunks is held in memory at a time. Exact and near
+    duplicate chunks are dropped before embedding. Results are stored
+    in the ingestion cache; a byte-identical document ingested with the same
+    settings is indexed straight from the cache without re-embedding.
+
+    With a `doc_id`, ingestion is incremental: pages whose content is already
+    indexed for that document are skipped, and chunks of pages that are no
+    longer in the document are removed from the vector store. Unchanged pages
+    whose duplicate chunks were dropped in favour of a removed page are
+    indexed again in full.
+
+    Args:
+        source: PDF file path (memory-mapped, never read into memory as a
+            whole) or raw PDF bytes.
+        doc_id (str): Stable document identity, e.g. the file name.
+
+    Returns:
+        int: Number of chunks indexed.
+    """
+    settings = ingestion_settings()
+    with open_pdf(source) as buffer:
+        key = ingestion_key(buffer, **settings)
+    manifest = load_manifest() if doc_id else {}
+    previous = set(document_pages(manifest, doc_id))
+    known_duplicates = document_duplicates(manifest, doc_id)
+
+    # Keys of the chunks indexed so far, taken out again if ingestion fails
+    # before the document is recorded, so a retry does not index them twice
+    written = set()
+    try:
+        cached = load_cached(key)
+        if cached is not None:
+            hashes = [page_hash(text) for text in cached.pages]
+            fresh = fresh_pages(hashes, previous)
+            rows = [i for i, page in enumerate(cached.chunk_pages) if page in fresh]
+            logger.info(f"Ingestion cache hit, indexing {len(rows)} of {len(cached.chunks)} chunks")
+            for batch in batched(rows, INGEST_BATCH_SIZE):
+                rows_batch = list(batch)
+                keys = [chunk_key(doc_id, hashes[cached.chunk_pages[i] - 1]) for i in rows_batch] if doc_id else None
+                written.update(keys or ())
+                index_text_chunks([cached.chunks[i] for i in rows_batch], cached.embeddings[rows_batch], keys)
+            total = len(rows)
+            duplicates = {hashes[page - 1]: sorted({hashes[s - 1] for s in sources})
+                          for page, sources in cached.duplicates.items() if page in fresh}
+            held = {hashes[i]: (i + 1, text) for i, text in enumerate(cached.pages) if hashes[i] in known_duplicates}
+        else:
+            hashes, total, duplicates, held = _ingest_pages(source, key, settings, doc_id, previous,
+                                                            set(known_duplicates), written)
+
+        if doc_id:
+            stale = previous - set(hashes)
+            reindex = pages_to_reindex(hashes, known_duplicates, stale)
+            if stale:
+                logger.info(f"Removing chunks of {len(stale)} pages no longer in {doc_id}")
+            remove_chunks({chunk_key(doc_id, digest) for digest in stale | reindex})
+            if reindex:
+                logger.info(f"Re-indexing {len(reindex)} pages of {doc_id} that repeated removed pages")
+                count, reindexed = reindex_pages(doc_id, [(*held[digest], digest) for digest in sorted(reindex)])
+                total += count
+                duplicates.update(reindexed)
+            present = set(hashes)
+            for page, sources in known_duplicates.items():
+                if page in present and page not in reindex:
+                    duplicates.setdefault(page, sources)
+            set_document_pages(doc_id, hashes, duplicates)
+    except Exception:
+        if written:
+            logger.warning(f"Ingesting {doc_id} failed; removing its {len(written)} newly indexed pages")
+            remove_chunks(written)
+        raise
+
+    return total
+
+
+def reindex_pages(doc_id: str, pages) -> Tuple[int, Dict[str, List[str]]]:
+    """
+    Chunk, embed and index whole pages of a document again.
+
+    Used for pages whose duplicate chunks were dropped in favour of chunks of
+    a page that has since been removed; they are de-duplicated only among
+    themselves.
+
+    Args:
+        doc_id (str): Document the pages belong to.
+        pages (List[tuple]): (page_number, text, page_hash) of every page.
+
+    Returns:
+        Tuple[int, Dict[str, List[str]]]: Chunks indexed, and the duplicate
+        sources of the pages (as in the document manifest).
+    """
+    dedup = make_deduplicator()
+    chunks, keys, duplicates = [], [], {}
+    for page_number, text, digest in pages:
+        page_chunks = chunk_page(text, page_number)
+        kept = dedup.filter(page_chunks, owner=digest) if dedup is not None else range(len(page_chunks))
+        if dedup is not None and dedup.duplicated:
+            duplicates[digest] = sorted(dedup.duplicated)
+        chunks.extend(page_chunks[i] for i in kept)
+        keys.extend([chunk_key(doc_id, digest)] * len(kept))
+
+    for start in range(0, len(chunks), INGEST_BATCH_SIZE):
+        batch = chunks[start:start + INGEST_BATCH_SIZE]
+        embeddings = embed_bulk(batch)
+        if len(embeddings) != len(batch):
+            raise RuntimeError("Embedding failed; see log for details")
+        index_text_chunks(batch, embeddings, keys[start:start + INGEST_BATCH_SIZE])
+    return len(chunks), duplicates
+
+
+def _ingest_pages(source, key, settings, doc_id, previous, dependent, written):
+    """
+    Stream, chunk, embed and index the pages of `source` not in `previous`,
+    adding the keys of indexed chunks to `written`.
+
+    Returns the page hashes, chunks indexed, duplicate sources of the new
+    pages, and the (page_number, text) of skipped pages in `dependent`,
+    which may have to be indexed again.
+    """
+    hashes, seen = [], set(previous)
+    duplicates, held = {}, {}
+    dedup = make_deduplicator()
+    pending = []  # (page_number, page_hash, chunk_text)
+    total = 0
+
+    with CacheWriter(key, **settings) as cache:
+        def flush(batch):
+            nonlocal total
+            chunks = [text for _, _, text in batch]
+            embeddings = embed_bulk(chunks)
+            if len(embeddings) != len(chunks):
+                raise RuntimeError("Embedding failed; see log for details")
+            keys = [chunk_key(doc_id, digest) for _, digest, _ in batch] if doc_id else None
+            written.update(keys or ())
+            index_text_chunks(chunks, embeddings, keys)
+            cache.add(chunks, embeddings, [page for page, _, _ in batch])
+            total += len(chunks)
+            logger.info(f"Indexed {total} chunks so far...")
+
+        for page_number, text in cache.record_pages(iter_pdf_pages(source)):
+            digest = page_hash(text)
+            hashes.append(digest)
+            if digest in seen:
+                if digest in previous:
+                    cache.mark_incomplete()
+                if digest in dependent:
+                    held[digest] = (page_number, text)
+                continue
+            seen.add(digest)
+
+            chunks = chunk_page(text, page_number)
+            kept = dedup.filter(chunks, owner=page_number) if dedup is not None else range(len(chunks))
+            if dedup is not None and dedup.duplicated:
+                cache.duplicates[page_number] = sorted(dedup.duplicated)
+                duplicates[digest] = sorted({hashes[number - 1] for number in dedup.duplicated})
+            pending.extend((page_number, digest, chunks[i]) for i in kept)
+            while len(pending) >= INGEST_BATCH_SIZE:
+                flush(pending[:INGEST_BATCH_SIZE])
+                pending = pending[INGEST_BATCH_SIZE:]
+        if pending:
+            flush(pending)
+
+    log_dedup(dedup, doc_id or "document")
+    return hashes, total, duplicates, held
@@ -1,15 +1,113 @@
-from PyPDF2 import PdfReader
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
 from io import BytesIO
+from typing import Iterator, List, NamedTuple, Optional
+
+from PyPDF2 import PdfReader
+
+from config.settings import PDF_EXTRACT_WORKERS, PDF_EXTRACT_SHARD_PAGES
+
+
+class PageText(NamedTuple):
+    """Text of a single PDF page; page numbers are 1-based."""
+    page_number: int
+    text: str
+
+
+@contextmanager
+def open_pdf(source):
+    """
+    Opens a PDF source as a read-only buffer without copying it.
+
+    Paths are memory-mapped, so the file is paged in on demand and shared
+    through the page cache rather than read into process memory. Bytes and
+    other buffers are passed through unchanged.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        yield source
+        return
+    with open(source, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+
+
+def _pdf_reader(buffer) -> PdfReader:
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        # BytesIO shares an immutable bytes object instead of copying it
+        return PdfReader(BytesIO(buffer))
+    # mmap (and other file-like objects) are read by PyPDF2 as a stream
+    return PdfReader(buffer)
+
+
+def iter_pdf_pages(source, workers: Optional[int] = None) -> Iterator[PageText]:
+    """
+    Lazily extracts a PDF one page at a time.
+
+    Only the text of the page currently being yielded is held in memory, so
+    consumers (e.g. `chunk_pages`) can stream arbitrarily long documents.
+
+    Args:
+        source: PDF file path (memory-mapped), raw bytes, or an open buffer
+            such as the one yielded by `open_pdf`.
+        workers (int): Extraction processes; defaults to PDF_EXTRACT_WORKERS.
+            With more than one worker, pages are extracted in parallel shards
+            but still yielded in document order. Parallel extraction needs a
+            path or bytes; other buffers are extracted serially.
+
+    Yields:
+        PageText: (page_number, text) for every page, in document order.
+    """
+    workers = workers or PDF_EXTRACT_WORKERS
+    with open_pdf(source) as buffer:
+        reader = _pdf_reader(buffer)
+        parallel_ok = isinstance(source, (str, os.PathLike, bytes))
+        if workers > 1 and parallel_ok and len(reader.pages) > PDF_EXTRACT_SHARD_PAGES:
+            yield from _iter_pages_parallel(source, len(reader.pages), workers)
+            return
+
+        for page_number, page in enumerate(reader.pages, start=1):
+            yield PageText(page_number, page.extract_text() or "")
+
+
+def extract_text_from_pdf(source, workers: Optional[int] = None):
+    return "".join(page.text for page in iter_pdf_pages(source, workers))
+
+
+# --- Parallel extraction
+# Each worker parses the document once (in its initializer) and then extracts
+# whole shards of pages, so only page indices and page text cross processes.
+# Paths are memory-mapped by every worker; bytes are sent to each worker once.
+
+_worker_reader: Optional[PdfReader] = None
+_worker_buffer = None
+
+
+def _init_worker(source):
+    global _worker_reader, _worker_buffer
+    _worker_buffer = open_pdf(source)
+    _worker_reader = _pdf_reader(_worker_buffer.__enter__())
+
 
+def _extract_shard(start: int, stop: int) -> List[PageText]:
+    return [
+        PageText(index + 1, _worker_reader.pages[index].extract_text() or "")
+        for index in range(start, stop)
+    ]
 
-def extract_text_from_pdf(file_bytes):
-    pdf_stream = BytesIO(file_bytes)  # wrap bytes
-    reader = PdfReader(pdf_stream)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
 
-# def extract_text_from_pdf(file_bytes):
-#     reader = PdfReader(file_bytes)
-#     return "\n".join([page.extract_text() for page in reader.pages])
+def _iter_pages_parallel(source, page_count: int, workers: int) -> Iterator[PageText]:
+    starts = range(0, page_count, PDF_EXTRACT_SHARD_PAGES)
+    stops = [min(start + PDF_EXTRACT_SHARD_PAGES, page_count) for start in starts]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(starts)),
+        initializer=_init_worker,
+        initargs=(source,),
+    ) as pool:
+        # map() preserves submission order, so shards come back in page order
+        for shard in pool.map(_extract_shard, starts, stops):
+            yield from shard
@@ -0,0 +1,266 @@
+"""
+Pipelined bulk ingestion of many PDFs (`cli upload-dir`).
+
+The stages run concurrently and are connected by bounded queues, so a slow
+stage applies back-pressure instead of letting work pile up in memory:
+
+    extract (process pool) -> chunk (caller thread) -> embed (thread) -> index (thread)
+
+Chunks from many documents are pooled into EMBED_BULK_BATCH_SIZE embedding
+batches, and index writes are buffered and flushed every
+INDEX_WRITE_BATCH_SIZE chunks (and once at the end) rather than per document.
+Documents are identified by their path relative to the ingest root (so
+same-named files in different folders stay apart), and are incremental and
+de-duplicated per document exactly like `ingest_pdf`. If a stage fails,
+documents that were fully indexed are still recorded, and the chunks of
+documents that were only partly indexed are removed again.
+"""
+import glob
+import os
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from queue import Queue
+from threading import Thread
+from typing import List, Optional
+
+import numpy as np
+
+from app.embedding.embedder import embed_bulk
+from app.embedding.indexer import index_text_chunks, remove_chunks
+from app.ingestion.cache import file_digest, ingestion_key_for_digest, load_cached
+from app.ingestion.documents import (
+    chunk_key, document_duplicates, document_pages, fresh_pages, load_manifest, page_hash, pages_to_reindex,
+    update_documents,
+)
+from app.ingestion.ingest import chunk_page, ingestion_settings, make_deduplicator, reindex_pages
+from app.ingestion.pdf_reader import iter_pdf_pages, open_pdf
+from app.utils.logger import logger
+from config.settings import (
+    INGEST_DIR_WORKERS, EMBED_BULK_BATCH_SIZE, INDEX_WRITE_BATCH_SIZE, PIPELINE_QUEUE_SIZE,
+)
+
+_DONE = object()
+
+
+def find_pdfs(pattern: str) -> List[str]:
+    """PDFs under a directory (recursively) or matching a glob pattern."""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*.pdf")
+    return sorted(p for p in glob.glob(pattern, recursive=True) if p.lower().endswith(".pdf"))
+
+
+def ingest_root(pattern: str) -> str:
+    """Directory that document ids of `find_pdfs(pattern)` are relative to."""
+    if os.path.isdir(pattern):
+        return pattern
+    parts = []
+    for part in pattern.split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    else:
+        return os.path.dirname(pattern) or "."  # a single file
+    return os.sep.join(parts) or (os.sep if pattern.startswith(os.sep) else ".")
+
+
+def _extract_file(path):
+    """Runs in a worker process: read one PDF and extract all its pages."""
+    with open_pdf(path) as buffer:
+        digest = file_digest(buffer)
+        pages = [page.text for page in iter_pdf_pages(buffer, workers=1)]
+    return digest, pages
+
+
+def _bounded_map(pool, fn, items, window):
+    """Like pool.map, but with at most `window` tasks submitted ahead of the consumer."""
+    pending = deque()
+    for item in items:
+        pending.append((item, pool.submit(fn, item)))
+        if len(pending) >= window:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def ingest_paths(paths: List[str], workers: Optional[int] = None, root: Optional[str] = None) -> int:
+    """
+    Ingests many PDFs with overlapping extract, embed and index stages.
+
+    Args:
+        paths (List[str]): PDF files.
+        workers (int): Extraction processes; defaults to INGEST_DIR_WORKERS.
+        root (str): Directory the document ids are relative to (see
+            `ingest_root`); without it, absolute paths are the ids.
+
+    Returns:
+        int: Number of chunks indexed.
+    """
+    workers = workers or INGEST_DIR_WORKERS
+    settings = ingestion_settings()
+    embed_queue = Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    write_queue = Queue(maxsize=PIPELINE_QUEUE_SIZE)
+    errors = []
+    indexed = 0
+    # Chunks queued and chunks written per document, to tell which documents
+    # were fully indexed if a stage fails
+    queued, written = Counter(), Counter()
+
+    def embed_stage():
+        while (batch := embed_queue.get()) is not _DONE:
+            if errors:
+                continue  # keep draining so producers never block
+            try:
+                chunks = [text for _, _, text in batch]
+                embeddings = embed_bulk(chunks)
+                if len(embeddings) != len(chunks):
+                    raise RuntimeError("Embedding failed; see log for details")
+                write_queue.put((chunks, embeddings, [key for _, key, _ in batch], [doc for doc, _, _ in batch]))
+            except Exception as e:
+                errors.append(e)
+        write_queue.put(_DONE)
+
+    def write_stage():
+        nonlocal indexed
+        buffered, count = [], 0
+
+        def flush():
+            nonlocal indexed
+            chunks = [c for batch in buffered for c in batch[0]]
+            keys = [k for batch in buffered for k in batch[2]]
+            index_text_chunks(chunks, np.concatenate([batch[1] for batch in buffered]), keys)
+            written.update(doc for batch in buffered for doc in batch[3])
+            indexed += len(chunks)
+            buffered.clear()
+            logger.info(f"Indexed {indexed} chunks so far...")
+
+        while (item := write_queue.get()) is not _DONE:
+            if errors:
+                continue
+            buffered.append(item)
+            count += len(item[0])
+            try:
+                if count >= INDEX_WRITE_BATCH_SIZE:
+                    flush()
+                    count = 0
+            except Exception as e:
+                errors.append(e)
+        try:
+            if buffered and not errors:
+                flush()
+        except Exception as e:
+            errors.append(e)
+
+    stages = [Thread(target=embed_stage, daemon=True), Thread(target=write_stage, daemon=True)]
+    for stage in stages:
+        stage.start()
+
+    manifest = load_manifest()
+    updates, duplicates, stale_keys, fresh_keys = {}, {}, {}, {}
+    reindex = {}  # doc_id -> pages to index again once stale chunks are removed
+    pending = []  # (doc_id, chunk_key, chunk_text) awaiting a full embedding batch
+    dropped = 0
+    current = None  # document being chunked, not complete if this stage fails
+    failure = None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, future in _bounded_map(pool, _extract_file, paths, workers * 2):
+                current = None
+                if errors:
+                    break
+                doc_id = os.path.relpath(path, root) if root else os.path.abspath(path)
+                if doc_id in updates:
+                    logger.warning(f"Skipping {path}: document id {doc_id} already ingested in this run")
+                    continue
+                try:
+                    digest, pages = future.result()
+                except Exception:
+                    logger.exception(f"Failed to extract {path}, skipping")
+                    continue
+
+                current = doc_id
+                hashes = [page_hash(text) for text in pages]
+                previous = set(document_pages(manifest, doc_id))
+                known = document_duplicates(manifest, doc_id)
+                fresh = fresh_pages(hashes, previous)
+                stale = previous - set(hashes)
+                dependent = pages_to_reindex(hashes, known, stale)
+                stale_keys[doc_id] = {chunk_key(doc_id, h) for h in stale | dependent}
+                if dependent:
+                    reindex[doc_id] = [(hashes.index(h) + 1, pages[hashes.index(h)], h) for h in sorted(dependent)]
+                updates[doc_id] = hashes
+                fresh_keys[doc_id] = {chunk_key(doc_id, hashes[page - 1]) for page in fresh}
+                present = set(hashes)
+                duplicates[doc_id] = {page: sources for page, sources in known.items()
+                                      if page in present and page not in dependent}
+
+                cached = load_cached(ingestion_key_for_digest(digest, **settings))
+                if cached is not None:
+                    rows = [i for i, page in enumerate(cached.chunk_pages) if page in fresh]
+                    if rows:
+                        keys = [chunk_key(doc_id, hashes[cached.chunk_pages[i] - 1]) for i in rows]
+                        queued[doc_id] += len(rows)
+                        write_queue.put(([cached.chunks[i] for i in rows], cached.embeddings[rows], keys,
+                                         [doc_id] * len(rows)))
+                    duplicates[doc_id].update({hashes[page - 1]: sorted({hashes[s - 1] for s in sources})
+                                               for page, sources in cached.duplicates.items() if page in fresh})
+                    continue
+
+                dedup = make_deduplicator()
+                for page_number in sorted(fresh):
+                    key = chunk_key(doc_id, hashes[page_number - 1])
+                    chunks = chunk_page(pages[page_number - 1], page_number)
+                    kept = dedup.filter(chunks, owner=page_number) if dedup is not None else range(len(chunks))
+                    if dedup is not None and dedup.duplicated:
+                        duplicates[doc_id][hashes[page_number - 1]] = sorted(
+                            {hashes[number - 1] for number in dedup.duplicated})
+                    pending.extend((doc_id, key, chunks[i]) for i in kept)
+                    queued[doc_id] += len(kept)
+                if dedup is not None:
+                    dropped += dedup.dropped
+                while len(pending) >= EMBED_BULK_BATCH_SIZE:
+                    embed_queue.put(pending[:EMBED_BULK_BATCH_SIZE])
+                    pending = pending[EMBED_BULK_BATCH_SIZE:]
+
+            current = None
+    except Exception as e:
+        # Chunking runs here; still index the documents chunked before the
+        # failing one, then roll back like a failure in the other stages
+        failure = e
+        pending = [item for item in pending if item[0] != current]
+    finally:
+        if pending and not errors:
+            embed_queue.put(pending)
+        embed_queue.put(_DONE)
+        for stage in stages:
+            stage.join()
+    if failure is not None:
+        errors.insert(0, failure)
+
+    if dropped:
+        logger.info(f"Dropped {dropped} duplicate chunks before embedding")
+    done = [doc_id for doc_id in updates if doc_id != current and written[doc_id] == queued[doc_id]]
+    if errors:
+        # Record what was fully indexed; take partly indexed documents back
+        # out so the next run indexes them once, not twice
+        partial = [doc_id for doc_id in updates if doc_id not in done]
+        logger.warning(f"Ingestion failed; keeping {len(done)} indexed documents, rolling back {len(partial)}")
+        remove_chunks({key for doc_id in partial for key in fresh_keys.get(doc_id, ())})
+    indexed += _finish(done, updates, duplicates, stale_keys, reindex)
+    if errors:
+        raise errors[0]
+    return indexed
+
+
+def _finish(doc_ids, updates, duplicates, stale_keys, reindex) -> int:
+    """Remove stale chunks of `doc_ids`, re-index their dependent pages and record them in the manifest."""
+    remove_chunks({key for doc_id in doc_ids for key in stale_keys.get(doc_id, ())})
+    count = 0
+    for doc_id in doc_ids:
+        if doc_id in reindex:
+            # Their duplicate chunks were dropped in favour of pages now removed
+            logger.info(f"Re-indexing {len(reindex[doc_id])} pages of {doc_id} that repeated removed pages")
+            reindexed, sources = reindex_pages(doc_id, reindex[doc_id])
+            count += reindexed
+            duplicates[doc_id].update(sources)
+    update_documents({doc_id: updates[doc_id] for doc_id in doc_ids}, duplicates)
+    return count
@@ -0,0 +1,231 @@
+"""
+Embedding benchmark: single-query latency (p50/p95/p99) and bulk throughput
+across batch sizes, text lengths, torch thread counts and model precisions.
+
+    python -m benchmarks.embedding_bench --batch-sizes 8,32,128 --threads 1,4 \
+        --precisions float32,int8 --output embed.json
+
+Every (backend, precision, threads) combination runs in a fresh subprocess,
+so thread settings and quantization never leak between configurations.
+The `embedder` backend also caps batches at EMBED_BATCH_TOKENS padded
+tokens. The sweep raises that budget (--batch-tokens) so the requested
+batch sizes are not silently capped. The budget and the batch sizes
+actually used are recorded with every result.
+Backends are pluggable: a name from BACKENDS or "package.module:factory",
+where factory(precision) returns an object with encode(texts, batch_size).
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.ingestion_bench import REPO_ROOT, metadata
+from benchmarks.synthetic import synthetic_pages
+
+PRECISIONS = ("float32", "int8")
+
+
+class EmbedderBackend:
+    """app.embedding.embedder.embed_text as the app uses it (length-bucketed batches)."""
+
+    def __init__(self, precision: str):
+        # EMBED_QUANTIZE and EMBED_BATCH_TOKENS are read at import; the parent
+        # sets them per run
+        from app.embedding.embedder import EMBED_BATCH_TOKENS, embed_text, get_model
+        get_model()
+        self._embed = embed_text
+        self.batch_tokens = EMBED_BATCH_TOKENS
+
+    def encode(self, texts, batch_size):
+        return self._embed(texts, batch_size=batch_size)
+
+    def batch_sizes(self, texts, batch_size):
+        """Sizes of the batches `encode` splits `texts` into."""
+        from app.embedding.embedder import _token_batches, token_lengths
+        return [len(batch) for batch in _token_batches(token_lengths(texts), self.batch_tokens, batch_size)]
+
+
+class SentenceTransformerBackend:
+    """Bare SentenceTransformer.encode with fixed-size batches."""
+
+    def __init__(self, precision: str):
+        from app.embedding.embedder import MODEL_ID
+        from app.embedding.model_registry import get_sentence_transformer
+        self._model = get_sentence_transformer(MODEL_ID, device="cpu", quantize=precision == "int8")
+
+    def encode(self, texts, batch_size):
+        return self._model.encode(texts, batch_size=batch_size, show_progress_bar=False,
+                                  convert_to_numpy=True, normalize_embeddings=True)
+
+
+class HashingBackend:
+    """No model: hash-derived vectors. Measures the harness itself."""
+
+    def __init__(self, precision: str):
+        pass
+
+    def encode(self, texts, batch_size):
+        seeds = [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in texts]
+        return np.stack([np.random.default_rng(seed).standard_normal(384).astype(np.float32) for seed in seeds])
+
+
+BACKENDS = {
+    "embedder": EmbedderBackend,
+    "sentence-transformers": SentenceTransformerBackend,
+    "hashing": HashingBackend,
+}
+
+
+def load_backend(name: str, precision: str):
+    """Instantiate a backend by BACKENDS name or "module:factory" path."""
+    if name in BACKENDS:
+        return BACKENDS[name](precision)
+    module, _, attr = name.partition(":")
+    if not attr:
+        raise ValueError(f"Unknown backend {name!r}; use one of {sorted(BACKENDS)} or 'module:factory'")
+    return getattr(importlib.import_module(module), attr)(precision)
+
+
+def texts_of(count: int, words: int, seed: int = 0):
+    return [page.replace("\n", " ") for page in synthetic_pages(count, words_per_page=words, seed=seed)]
+
+
+def latency_stats(seconds) -> dict:
+    ms = np.asarray(seconds) * 1000
+    return {
+        "samples": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(ms, 99)), 3),
+    }
+
+
+def run_config(backend: str, precision: str, threads: int, batch_sizes, lengths,
+               queries: int = 200, query_words: int = 12, bulk_texts: int = 512) -> dict:
+    """Benchmark one configuration in the current process (called inside the subprocess)."""
+    if threads:
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    started = time.perf_counter()
+    model = load_backend(backend, precision)
+    run = {"backend": backend, "precision": precision, "threads": threads,
+           "load_seconds": round(time.perf_counter() - started, 3),
+           "batch_tokens": getattr(model, "batch_tokens", None)}
+
+    questions = texts_of(queries, query_words, seed=1)
+    for question in questions[:5]:
+        model.encode([question], 1)  # warm up
+    timings = []
+    for question in questions:
+        started = time.perf_counter()
+        model.encode([question], 1)
+        timings.append(time.perf_counter() - started)
+    run["latency"] = latency_stats(timings)
+
+    run["bulk"] = []
+    for words in lengths:
+        texts = texts_of(bulk_texts, words, seed=2)
+        for batch_size in batch_sizes:
+            started = time.perf_counter()
+            vectors = model.encode(texts, batch_size)
+            seconds = time.perf_counter() - started
+            result = {
+                "words": words,
+                "batch_size": batch_size,
+                "texts": len(vectors),
+                "seconds": round(seconds, 6),
+                "texts_per_second": round(len(vectors) / seconds, 3) if seconds > 0 else None,
+            }
+            if hasattr(model, "batch_sizes"):
+                # The backend may split batches further than asked
+                sizes = model.batch_sizes(texts, batch_size)
+                result["effective_batch_size"] = round(len(texts) / len(sizes), 1)
+                result["max_batch_size"] = max(sizes)
+            run["bulk"].append(result)
+    return run
+
+
+def _ints(value: str):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backends", default="embedder",
+                        help=f"comma-separated backends ({', '.join(BACKENDS)} or module:factory)")
+    parser.add_argument("--precisions", default="float32", help="comma-separated subset of " + ",".join(PRECISIONS))
+    parser.add_argument("--threads", default="0", help="comma-separated torch thread counts (0 = torch default)")
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--lengths", default="16,64,192", help="comma-separated words per bulk text")
+    parser.add_argument("--queries", type=int, default=200, help="single-query latency samples")
+    parser.add_argument("--bulk-texts", type=int, default=512, help="texts per bulk measurement")
+    parser.add_argument("--batch-tokens", type=int, default=0,
+                        help="EMBED_BATCH_TOKENS for the embedder backend (default: enough for the "
+                             "largest batch of full-length texts)")
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        print(json.dumps(run_config(**json.loads(args.run_one))))
+        return
+
+    precisions = [p for p in args.precisions.split(",") if p]
+    unknown = set(precisions) - set(PRECISIONS)
+    if unknown:
+        parser.error(f"unknown precisions: {', '.join(sorted(unknown))}")
+    settings = ("EMBED_BATCH_TOKENS", "EMBED_WORKERS")
+    results = {"meta": metadata(settings, config=vars(args)), "runs": []}
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")]))}
+    # Measure the model, not the embedding cache
+    env["EMBED_CACHE_ENABLED"] = "false"
+    if args.batch_tokens or "EMBED_BATCH_TOKENS" not in env:
+        from app.embedding.embedder import MAX_SEQ_TOKENS
+        env["EMBED_BATCH_TOKENS"] = str(args.batch_tokens or max(_ints(args.batch_sizes)) * MAX_SEQ_TOKENS)
+
+    for backend in (b for b in args.backends.split(",") if b):
+        for precision in precisions:
+            for threads in _ints(args.threads):
+                config = {"backend": backend, "precision": precision, "threads": threads,
+                          "batch_sizes": _ints(args.batch_sizes), "lengths": _ints(args.lengths),
+                          "queries": args.queries, "bulk_texts": args.bulk_texts}
+                run_env = {**env, "EMBED_QUANTIZE": str(precision == "int8").lower()}
+                if threads:
+                    run_env["OMP_NUM_THREADS"] = str(threads)
+                proc = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.embedding_bench", "--run-one", json.dumps(config)],
+                    env=run_env, capture_output=True, text=True,
+                )
+                label = f"{backend}/{precision}/{threads or 'default'} threads"
+                if proc.returncode != 0:
+                    results["runs"].append({**config, "error": proc.stderr.strip().splitlines()[-1:]})
+                    print(f"{label}: failed", file=sys.stderr)
+                    continue
+                run = json.loads(proc.stdout.strip().splitlines()[-1])
+                results["runs"].append(run)
+                best = max(run["bulk"], key=lambda b: b["texts_per_second"] or 0, default=None)
+                print(f"{label}: p50 {run['latency']['p50_ms']} ms, p99 {run['latency']['p99_ms']} ms"
+                      + (f", best {best['texts_per_second']} texts/s at batch {best['batch_size']}" if best else ""),
+                      file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
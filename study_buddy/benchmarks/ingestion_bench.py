@@ -0,0 +1,203 @@
+"""
+Ingestion benchmark: times extract -> chunk -> embed -> index on synthetic
+and sample PDFs and writes machine-readable results.
+
+    python -m benchmarks.ingestion_bench --pages 50,500 --pdf notes.pdf --output bench.json
+
+Every document is benchmarked in a fresh subprocess whose working directory
+is a temporary directory, so peak RSS is per run, the model load is not
+mixed into stage timings, and the real data/ stores are never touched.
+Each stage reports wall time, throughput and the peak RSS sampled while it
+ran (plus the growth over the RSS at stage start).
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+STAGES = ("extract", "chunk", "embed", "index")
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (e.g. macOS): fall back to the lifetime peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class RssSampler:
+    """Context manager that tracks peak RSS from a background thread."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss())
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss())
+        return False
+
+
+def measure(stage: str, unit: str, fn, count):
+    """Run fn() and return (result, stats); `count(result)` gives the items processed."""
+    with RssSampler() as rss:
+        started = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - started
+    items = count(result)
+    return result, {
+        "stage": stage,
+        "seconds": round(seconds, 6),
+        "items": items,
+        "unit": unit,
+        "per_second": round(items / seconds, 3) if seconds > 0 else None,
+        "peak_rss_mb": round(rss.peak / 2 ** 20, 1),
+        "rss_growth_mb": round((rss.peak - rss.start) / 2 ** 20, 1),
+    }
+
+
+def run_document(path: str, stages) -> dict:
+    """Benchmark one PDF in the current process (called inside the subprocess)."""
+    os.makedirs("data/faiss", exist_ok=True)
+    # Imported here, after the working directory is set up, because these
+    # modules resolve their data/ paths and load stores at import time
+    import numpy as np
+    from PyPDF2 import PdfReader
+    from app.ingestion.pdf_reader import extract_text_from_pdf
+    from app.ingestion.chunker import chunk_text
+
+    run = {"document": path, "pages": len(PdfReader(path).pages), "stages": []}
+    embeddings = None
+
+    # Later stages need the real text and chunks; earlier stages are always
+    # run, but only reported when selected
+    text, stats = measure("extract", "pages", lambda: extract_text_from_pdf(path), lambda _: run["pages"])
+    if "extract" in stages:
+        run["stages"].append(stats)
+    chunks, stats = measure("chunk", "chunks", lambda: chunk_text(text), len)
+    if "chunk" in stages:
+        run["stages"].append(stats)
+
+    if "embed" in stages:
+        started = time.perf_counter()
+        from app.embedding.embedder import embed_bulk
+        embed_bulk(["warm up"])
+        run["model_load_seconds"] = round(time.perf_counter() - started, 3)
+        embeddings, stats = measure("embed", "embeddings", lambda: embed_bulk(chunks), len)
+        run["stages"].append(stats)
+    elif "index" in stages:
+        # Index on its own: random unit vectors stand in for embeddings
+        embeddings = np.random.default_rng(0).standard_normal((len(chunks), 384)).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    if "index" in stages:
+        from app.embedding.indexer import index_text_chunks
+        _, stats = measure("index", "chunks", lambda: index_text_chunks(chunks, embeddings), lambda _: len(chunks))
+        run["stages"].append(stats)
+    return run
+
+
+def metadata(setting_names, **extra) -> dict:
+    """Run metadata: commit, interpreter, platform and the given env settings."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    settings = {name: os.getenv(name) for name in setting_names if os.getenv(name) is not None}
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        **extra,
+        "settings": settings,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", default="20,200",
+                        help="comma-separated page counts of synthetic PDFs ('' for none)")
+    parser.add_argument("--words-per-page", type=int, default=450)
+    parser.add_argument("--pdf", action="append", default=[], help="sample PDF to benchmark (repeatable)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of " + ",".join(STAGES))
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.stages = [s for s in args.stages.split(",") if s]
+    unknown = set(args.stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    if args.run_one:
+        print(json.dumps(run_document(args.run_one, args.stages)))
+        return
+
+    from benchmarks.synthetic import make_pdf, synthetic_pages
+
+    settings = ("VECTOR_DB", "CHUNK_SIZE", "CHUNK_OVERLAP", "PDF_EXTRACT_WORKERS")
+    results = {"meta": metadata(settings, stages=args.stages), "runs": []}
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")]))}
+    # Measure the model, not the embedding cache, unless asked otherwise
+    env.setdefault("EMBED_CACHE_ENABLED", "false")
+    with tempfile.TemporaryDirectory(prefix="ingest-bench-") as workdir:
+        documents = [(os.path.basename(p), os.path.abspath(p)) for p in args.pdf]
+        for count in (int(n) for n in args.pages.split(",") if n):
+            path = os.path.join(workdir, f"synthetic-{count}.pdf")
+            with open(path, "wb") as f:
+                f.write(make_pdf(synthetic_pages(count, args.words_per_page)))
+            documents.append((f"synthetic-{count}", path))
+
+        for label, path in documents:
+            rundir = tempfile.mkdtemp(dir=workdir)
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.ingestion_bench", "--run-one", path,
+                 "--stages", ",".join(args.stages)],
+                cwd=rundir, env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                results["runs"].append({"label": label, "error": proc.stderr.strip().splitlines()[-1:]})
+                continue
+            run = json.loads(proc.stdout.strip().splitlines()[-1])
+            results["runs"].append({"label": label, **run})
+            for stage in run["stages"]:
+                print(f"{label:>20} {stage['stage']:>8}: {stage['per_second']} {stage['unit']}/s, "
+                      f"peak RSS {stage['peak_rss_mb']} MB", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
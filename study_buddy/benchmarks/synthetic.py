@@ -0,0 +1,61 @@
+"""Synthetic PDFs for tests and benchmarks (no PDF-writing dependency needed)."""
+import random
+from typing import List
+
+_WORDS = (
+    "cell energy protein membrane gradient enzyme reaction molecule structure function "
+    "theory model equation variable system process result method analysis data sample "
+    "history revolution economy policy society culture language network signal memory"
+).split()
+
+
+def synthetic_pages(count: int, words_per_page: int = 450, seed: int = 0) -> List[str]:
+    """Pseudo-text pages made of short sentences, wrapped into ~80-char lines."""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(count):
+        sentences = []
+        remaining = words_per_page
+        while remaining > 0:
+            length = min(remaining, rng.randint(6, 18))
+            words = rng.choices(_WORDS, k=length)
+            sentences.append(" ".join(words).capitalize() + ".")
+            remaining -= length
+        lines, line = [], ""
+        for word in " ".join(sentences).split():
+            if len(line) + len(word) > 80:
+                lines.append(line)
+                line = ""
+            line = f"{line} {word}" if line else word
+        lines.append(line)
+        pages.append("\n".join(lines))
+    return pages
+
+
+def make_pdf(page_texts: List[str]) -> bytes:
+    """Build a minimal PDF (Helvetica, one text line per input line) from page texts."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for text in page_texts:
+        lines = [
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") Tj T*"
+            for line in text.split("\n")
+        ]
+        stream = "BT /F1 10 Tf 12 TL 50 750 Td " + " ".join(lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append("<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
@@ -1,13 +1,12 @@
 import os
 from functools import lru_cache
 
-import torch
-from agno.embedder.sentence_transformer import SentenceTransformerEmbedder
-from sentence_transformers import SentenceTransformer
 from agno.models.ollama import Ollama
 from agno.models.groq import Groq
 from dotenv import load_dotenv
 
+from config.settings import EMBED_QUANTIZE
+
 load_dotenv()
 
 LLM_PROVIDER = os.getenv("LLM_PROVIDER", "ollama")
@@ -38,17 +37,33 @@ def get_llm():
         raise ValueError(f"Invalid LLM_PROVIDER: {LLM_PROVIDER}")
 
 
+@lru_cache()
 def get_embedding_model():
+    """
+    Shared agno embedder for all agents.
+
+    The SentenceTransformer comes from the process-wide model registry, so
+    it is loaded once and also shared with app.embedding.embedder.
+    """
+    # torch and sentence-transformers are imported here so that importing
+    # this module (e.g. for the LLM only) does not pay for loading them
+    import torch
+    from app.embedding.agno_embedder import CachedSentenceTransformerEmbedder
+    from app.embedding.model_registry import get_sentence_transformer
+
     # 1. Detect MPS (Apple GPU) or fall back to CPU
     device = "mps" if torch.backends.mps.is_available() else "cpu"
 
-    # 2. Create the SBERT model on the chosen device
-    st_model = SentenceTransformer("all-MiniLM-L6-v2", device=device)  # :contentReference[oaicite:0]{index=0}
+    # 2. Get the shared SBERT model on the chosen device
+    quantize = EMBED_QUANTIZE and device == "cpu"
+    st_model = get_sentence_transformer("all-MiniLM-L6-v2", device=device, quantize=quantize)
+    model_id = "sentence-transformers/all-MiniLM-L6-v2"
+    if quantize:
+        model_id += "-int8"  # keeps cached and fingerprinted vectors apart
 
-    # 3. Inject that client into the AGNO embedder
-    embedder = SentenceTransformerEmbedder(
-        id="sentence-transformers/all-MiniLM-L6-v2",
+    # 3. Inject that client into the AGNO embedder (cached by text content)
+    embedder = CachedSentenceTransformerEmbedder(
+        id=model_id,
         sentence_transformer_client=st_model
     )
     return embedder
-
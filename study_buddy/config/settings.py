@@ -1,7 +1,119 @@
 # App settings
+import os
+from dotenv import load_dotenv
+
+# Read .env here, so settings see it whichever module imports them first
+load_dotenv()
+
 APP_NAME = "AI Study Buddy"
 
 # Vector DB backend: "faiss" or "chroma"
 # Can be overridden with the VECTOR_DB environment variable
-import os
 VECTOR_DB = os.getenv("VECTOR_DB", "faiss").lower()
+
+# FAISS vector storage: "float32" (exact), "float16" or "int8" (scalar
+# quantized with per-dimension scales). Existing indexes are converted with
+# `cli rebuild-index`.
+VECTOR_PRECISION = os.getenv("VECTOR_PRECISION", "float32").lower()
+
+# Project FAISS vectors (stored and query) onto this many principal
+# components; 0 keeps the full embedding. The projection is fitted by
+# `cli rebuild-index`; pick a dimension with `cli pca-dims`.
+VECTOR_PCA_DIM = int(os.getenv("VECTOR_PCA_DIM", "0"))
+
+# FAISS search structure: "flat" (exact), "hnsw" or "ivf" (approximate).
+# HNSW_M links per node; HNSW_EF_SEARCH / IVF_NPROBE trade query speed for
+# recall and can be overridden per query. IVF indexes (IVF_NLIST lists) are
+# trained by `cli rebuild-index`, which also migrates existing indexes.
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat").lower()
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+IVF_NLIST = int(os.getenv("IVF_NLIST", "1024"))
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
+
+# New FAISS vectors are appended to a log (data/faiss/index.log) and only
+# compacted into index.bin once it holds this many vectors, or on
+# `cli checkpoint`. Readers replay the log, so nothing waits for a checkpoint.
+# Removed chunks are likewise only marked (data/faiss/removed) and filtered
+# from searches until this many are marked or the next checkpoint.
+INDEX_CHECKPOINT_VECTORS = int(os.getenv("INDEX_CHECKPOINT_VECTORS", "100000"))
+
+# Long-running retrievers (API, MCP tool) check the FAISS store for new
+# content at most this often and swap it in without a restart; 0 disables
+INDEX_RELOAD_SECONDS = float(os.getenv("INDEX_RELOAD_SECONDS", "2"))
+
+# Retrievers memory-map index.bin instead of reading it, so start-up time
+# does not grow with the index and processes share one copy in the page
+# cache. INDEX_PREFAULT reads the file once at load, so the first searches
+# do not wait for the disk.
+INDEX_MMAP = os.getenv("INDEX_MMAP", "true").lower() == "true"
+INDEX_PREFAULT = os.getenv("INDEX_PREFAULT", "false").lower() == "true"
+
+
+def _workers(name, default):
+    """Read a worker-count setting; "auto" means one worker per CPU core."""
+    value = os.getenv(name, default).strip().lower()
+    if value == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(value))
+
+
+# Chunking (characters); chunks are additionally capped at the model's token limit
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "500"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+
+# Number of chunks embedded and indexed together while streaming a document
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+
+# Content-addressed cache of extracted pages, chunks and embeddings per PDF
+INGEST_CACHE_ENABLED = os.getenv("INGEST_CACHE_ENABLED", "true").lower() == "true"
+INGEST_CACHE_DIR = os.getenv("INGEST_CACHE_DIR", "data/cache/ingest")
+
+# Drop duplicate chunks of a document before embedding: exact duplicates
+# always, near duplicates at or above DEDUP_THRESHOLD Jaccard similarity
+# (MinHash estimate; 0 disables near-duplicate detection)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# Page fingerprints of ingested documents, used for incremental re-ingestion
+DOCUMENTS_PATH = os.getenv("DOCUMENTS_PATH", f"data/{VECTOR_DB}_documents.json")
+
+# PDF text extraction: 1 = serial (default), N or "auto" = process pool.
+# Pages are handed to workers in shards of PDF_EXTRACT_SHARD_PAGES.
+PDF_EXTRACT_WORKERS = _workers("PDF_EXTRACT_WORKERS", "1")
+PDF_EXTRACT_SHARD_PAGES = int(os.getenv("PDF_EXTRACT_SHARD_PAGES", "16"))
+
+# Directory ingestion (cli upload-dir): extraction processes, chunks per
+# embedding batch, chunks buffered per index write, and queue depth between
+# pipeline stages
+INGEST_DIR_WORKERS = _workers("INGEST_DIR_WORKERS", "auto")
+EMBED_BULK_BATCH_SIZE = int(os.getenv("EMBED_BULK_BATCH_SIZE", "1024"))
+INDEX_WRITE_BATCH_SIZE = int(os.getenv("INDEX_WRITE_BATCH_SIZE", "50000"))
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+
+# Bulk (ingestion) embedding: 1 = in-process (default), N or "auto" = chunks
+# are sharded across N worker processes, each with its own model copy
+EMBED_WORKERS = _workers("EMBED_WORKERS", "1")
+
+# Embedding batches are formed from texts of similar token length and capped
+# at this many padded tokens (texts x longest text) rather than a fixed count
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "8192"))
+
+# Run CPU embedding models with int8 dynamically quantized linear layers;
+# check the cost with `cli check-quantization`
+EMBED_QUANTIZE = os.getenv("EMBED_QUANTIZE", "false").lower() == "true"
+
+# The embedding model is loaded on first use; servers load it at startup
+# instead so the first request does not pay for it
+EMBED_WARMUP = os.getenv("EMBED_WARMUP", "true").lower() == "true"
+
+# Embeddings of previously seen texts, keyed by model and normalization:
+# an in-memory LRU of EMBED_CACHE_LRU_SIZE vectors in front of an on-disk store
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+EMBED_CACHE_DIR = os.getenv("EMBED_CACHE_DIR", "data/cache/embeddings")
+EMBED_CACHE_LRU_SIZE = int(os.getenv("EMBED_CACHE_LRU_SIZE", "10000"))
+
+# Concurrent single-query embeddings are coalesced into one model call of up
+# to EMBED_BATCH_MAX_SIZE texts, waiting at most EMBED_BATCH_WINDOW_MS under load
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "64"))
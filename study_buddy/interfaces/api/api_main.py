@@ -1,14 +1,29 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import tempfile
 import asyncio
+from app.embedding.embedder import warm_up
+from config.settings import EMBED_WARMUP
 from app.agents.study_agent import build_agent, use_agent, get_agent_info, reset_agents
 from interfaces.api.models import (
     QueryRequest, QueryResponse, UploadResponse,
     BuildAgentRequest, BuildAgentResponse, AgentStatusResponse
 )
 
-app = FastAPI(title="AI Study Buddy API", version="2.0.0")
+# Uploads are copied to disk in slices of this size rather than read whole
+UPLOAD_COPY_CHUNK = 1024 * 1024
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model before serving instead of on the first request
+    if EMBED_WARMUP:
+        await asyncio.to_thread(warm_up)
+    yield
+
+
+app = FastAPI(title="AI Study Buddy API", version="2.0.0", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -50,10 +65,11 @@ async def upload_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="Only PDF files are supported.")
 
     try:
-        # Save uploaded file to temporary location
+        # Stream the upload to a temporary file instead of reading it into
+        # memory; the PDF agent then loads it from that path
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            content = await file.read()
-            tmp_file.write(content)
+            while chunk := await file.read(UPLOAD_COPY_CHUNK):
+                tmp_file.write(chunk)
             pdf_path = tmp_file.name
 
         # Build PDF agent
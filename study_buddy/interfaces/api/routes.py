@@ -11,6 +11,9 @@ from app.agents.study_agent import build_agent, use_agent, get_agent_info, reset
 
 executor = ThreadPoolExecutor(max_workers=4)
 
+# Uploads are copied to disk in slices of this size rather than read whole
+UPLOAD_COPY_CHUNK = 1024 * 1024
+
 
 def run_in_thread(func, *args):
     """Run function in thread pool"""
@@ -86,10 +89,10 @@ async def upload_pdf(request: Request):
                 status_code=HTTP_400_BAD_REQUEST
             )
 
-        # Save to temporary file
-        contents = await file.read()
+        # Stream to a temporary file; the PDF is then handled by path
         with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-            tmp_file.write(contents)
+            while chunk := await file.read(UPLOAD_COPY_CHUNK):
+                tmp_file.write(chunk)
             pdf_path = tmp_file.name
 
         # Build PDF agent
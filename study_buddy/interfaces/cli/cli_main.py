@@ -1,14 +1,15 @@
 import asyncio
+import os
+from typing import Optional
 
 import typer
 
-from app.embedding.embedder import embed_text
-from app.ingestion.chunker import chunk_text
-from app.ingestion.pdf_reader import extract_text_from_pdf
-from app.embedding.indexer import index_text_chunks
-from app.embedding.retriever import retrieve_relevant_chunks
+from app.ingestion.ingest import ingest_pdf
+from app.ingestion.pipeline import find_pdfs, ingest_paths, ingest_root
+from app.embedding.indexer import checkpoint, rebuild_index
+from app.embedding.retriever import load_chunks, retrieve_relevant_chunks
 from app.agents.pdf_agent_v1 import answer_with_context
-from config.settings import VECTOR_DB
+from config.settings import VECTOR_DB, VECTOR_PRECISION
 
 from app.utils.logger import logger
 
@@ -16,19 +17,106 @@ cli = typer.Typer()
 
 
 @cli.command()
-def upload(path: str):
-    with open(path, "rb") as f:
-        text = extract_text_from_pdf(f.read())
+def upload(
+        path: str,
+        doc_id: Optional[str] = typer.Option(
+            None, help="Document identity for incremental re-ingestion (default: file name)"),
+):
+    doc_id = doc_id or os.path.basename(path)
+    logger.info(f"Ingesting {doc_id} into {VECTOR_DB.upper()}...")
+    # The path is memory-mapped by the ingestion pipeline, not read into memory
+    total = ingest_pdf(path, doc_id=doc_id)
+    logger.info(f"Indexing complete! ({total} new chunks)")
 
-    logger.info("Extracted text, now chunking...")
-    chunks = chunk_text(text)
 
-    logger.info(f"Chunked into {len(chunks)} parts, embedding...")
-    embeddings = embed_text(chunks)
+@cli.command("upload-dir")
+def upload_dir(
+        pattern: str,
+        workers: Optional[int] = typer.Option(None, help="Extraction processes (default: INGEST_DIR_WORKERS)"),
+):
+    """
+    Ingest every PDF in a directory, or matching a glob such as 'notes/**/*.pdf'.
+    Documents are identified by their path below the directory (or the
+    glob's fixed prefix).
+    """
+    paths = find_pdfs(pattern)
+    if not paths:
+        typer.echo(f"❌ No PDFs found for {pattern}")
+        raise typer.Exit(1)
 
-    logger.info(f"Indexing to {VECTOR_DB.upper()}...")
-    index_text_chunks(chunks, embeddings)
-    logger.info("Indexing complete!")
+    logger.info(f"Ingesting {len(paths)} PDFs into {VECTOR_DB.upper()}...")
+    total = ingest_paths(paths, workers, root=ingest_root(pattern))
+    logger.info(f"Indexing complete! ({total} new chunks from {len(paths)} files)")
+
+
+@cli.command("rebuild-index")
+def rebuild():
+    """Rebuild the FAISS index from the stored chunks, e.g. after changing VECTOR_PRECISION."""
+    logger.info(f"Rebuilding FAISS index with {VECTOR_PRECISION} vectors...")
+    total = rebuild_index()
+    logger.info(f"Rebuild complete! ({total} chunks)")
+
+
+@cli.command("checkpoint")
+def checkpoint_index():
+    """Compact the FAISS vector log and removed chunks into index.bin."""
+    pending = checkpoint()
+    logger.info(f"Checkpoint complete! ({pending} logged vectors written to the index)")
+
+
+@cli.command("pca-dims")
+def pca_dims(
+        variance: Optional[float] = typer.Option(None, help="Retained-variance target, e.g. 0.95"),
+        recall: Optional[float] = typer.Option(None, help="Neighbour recall@10 target, e.g. 0.9"),
+        samples: int = typer.Option(5000, help="Indexed chunks to sample"),
+):
+    """Suggest a VECTOR_PCA_DIM from a sample of the indexed chunks."""
+    from app.embedding.embedder import embed_bulk
+    from app.embedding.pca import pca_report, pick_dim
+
+    chunks = load_chunks()
+    step = max(1, len(chunks) // samples)
+    texts = [chunks[i] for i in range(0, len(chunks), step)][:samples]
+    if len(texts) < 2:
+        typer.echo("❌ Not enough indexed chunks; upload some documents first")
+        raise typer.Exit(1)
+
+    report = pca_report(embed_bulk(texts))
+    typer.echo(f"{'dim':>5}  {'variance':>8}  {'recall@10':>9}")
+    for option in report:
+        typer.echo(f"{option.dim:>5}  {option.variance:>8.3f}  {option.recall:>9.3f}")
+    if variance is not None or recall is not None:
+        dim = pick_dim(report, variance, recall)
+        typer.echo(f"Suggested VECTOR_PCA_DIM={dim}" if dim else "No candidate dimension meets the target")
+
+
+@cli.command("check-quantization")
+def check_quantization(
+        samples: int = typer.Option(256, help="Indexed chunks to compare (built-in sentences if none)"),
+):
+    """Report how closely int8 quantized embeddings agree with the fp32 model."""
+    from app.embedding.embedder import MODEL_ID
+    from app.embedding.model_registry import get_sentence_transformer
+    from app.embedding.quantization import SAMPLE_TEXTS, check_agreement
+
+    try:
+        chunks = load_chunks()
+        step = max(1, len(chunks) // samples)
+        texts = [chunks[i] for i in range(0, len(chunks), step)][:samples]
+    except RuntimeError:
+        texts = []
+    texts = texts or SAMPLE_TEXTS
+
+    report = check_agreement(
+        texts,
+        get_sentence_transformer(MODEL_ID, device="cpu"),
+        get_sentence_transformer(MODEL_ID, device="cpu", quantize=True),
+    )
+    typer.echo(f"Samples:        {report.samples}")
+    typer.echo(f"Mean cosine:    {report.mean_cosine:.4f}")
+    typer.echo(f"Min cosine:     {report.min_cosine:.4f}")
+    typer.echo(f"fp32 encode:    {report.fp32_seconds:.2f}s")
+    typer.echo(f"int8 encode:    {report.int8_seconds:.2f}s ({report.speedup:.1f}x)")
 
 
 @cli.command()
@@ -0,0 +1,57 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.embedding.batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    def __init__(self, delay=None):
+        self.batches = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        if self.delay:
+            self.delay.wait(1)
+        self.batches.append(list(texts))
+        return np.array([[len(t)] for t in texts], dtype=np.float32)
+
+
+def test_single_caller_gets_its_own_vector():
+    encode = RecordingEncoder()
+    batcher = EmbeddingBatcher(encode, max_batch=8, window_ms=5)
+    try:
+        assert batcher.embed("abc").tolist() == [3.0]
+        assert batcher.embed("abcde").tolist() == [5.0]
+    finally:
+        batcher.close()
+    assert encode.batches == [["abc"], ["abcde"]]
+
+
+def test_concurrent_requests_are_coalesced():
+    release = threading.Event()
+    encode = RecordingEncoder(delay=release)
+    batcher = EmbeddingBatcher(encode, max_batch=8, window_ms=50)
+    try:
+        first = batcher.submit("x")
+        futures = [batcher.submit("y" * n) for n in range(1, 6)]
+        release.set()
+        assert first.result().tolist() == [1.0]
+        assert [f.result().tolist() for f in futures] == [[float(n)] for n in range(1, 6)]
+    finally:
+        batcher.close()
+    assert len(encode.batches) < 6
+    assert sorted(sum(encode.batches, [])) == sorted(["x"] + ["y" * n for n in range(1, 6)])
+
+
+def test_encoder_errors_reach_every_caller():
+    def encode(texts):
+        raise ValueError("boom")
+
+    batcher = EmbeddingBatcher(encode)
+    try:
+        with pytest.raises(ValueError):
+            batcher.embed("a")
+    finally:
+        batcher.close()
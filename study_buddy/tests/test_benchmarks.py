@@ -0,0 +1,88 @@
+import pytest
+
+from benchmarks.ingestion_bench import measure, run_document
+from benchmarks.synthetic import make_pdf, synthetic_pages
+
+
+def test_measure_reports_throughput_and_rss():
+    result, stats = measure("chunk", "chunks", lambda: [1, 2, 3], len)
+    assert result == [1, 2, 3]
+    assert stats["stage"] == "chunk" and stats["items"] == 3 and stats["unit"] == "chunks"
+    assert stats["peak_rss_mb"] > 0
+    assert stats["seconds"] >= 0
+
+
+def test_run_document_extract_and_chunk(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(synthetic_pages(4, words_per_page=200)))
+    run = run_document(str(path), ["extract", "chunk"])
+    assert run["pages"] == 4
+    assert [s["stage"] for s in run["stages"]] == ["extract", "chunk"]
+    assert run["stages"][1]["items"] > 4
+
+
+def test_latency_stats_percentiles():
+    from benchmarks.embedding_bench import latency_stats
+
+    stats = latency_stats([i / 1000 for i in range(1, 101)])
+    assert stats["samples"] == 100
+    assert stats["p50_ms"] == pytest.approx(50.5)
+    assert stats["p95_ms"] <= stats["p99_ms"] <= 100
+
+
+def test_run_config_with_hashing_backend():
+    from benchmarks.embedding_bench import run_config
+
+    run = run_config("hashing", "float32", 0, batch_sizes=[1, 4], lengths=[8, 32], queries=10, bulk_texts=6)
+    assert run["latency"]["samples"] == 10
+    assert [(b["words"], b["batch_size"]) for b in run["bulk"]] == [(8, 1), (8, 4), (32, 1), (32, 4)]
+    assert all(b["texts"] == 6 for b in run["bulk"])
+
+
+def test_custom_backend_by_import_path():
+    from benchmarks.embedding_bench import HashingBackend, load_backend
+
+    assert isinstance(load_backend("benchmarks.embedding_bench:HashingBackend", "float32"), HashingBackend)
+    with pytest.raises(ValueError):
+        load_backend("no-such-backend", "float32")
+
+
+def test_run_document_index_only_indexes_the_real_chunks(tmp_path, monkeypatch):
+    pytest.importorskip("faiss")
+    from app.embedding import indexer
+
+    indexed = []
+    monkeypatch.setattr(indexer, "index_text_chunks", lambda chunks, embeddings: indexed.append(len(chunks)))
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(make_pdf(synthetic_pages(4, words_per_page=200)))
+    run = run_document(str(path), ["index"])
+    assert [s["stage"] for s in run["stages"]] == ["index"]
+    assert run["stages"][0]["items"] == indexed[0] > 4
+
+
+class CappedBackend:
+    """Splits every request into batches of at most 3 texts."""
+
+    batch_tokens = 96
+
+    def __init__(self, precision):
+        pass
+
+    def encode(self, texts, batch_size):
+        return [[0.0]] * len(texts)
+
+    def batch_sizes(self, texts, batch_size):
+        size = min(batch_size, 3)
+        return [min(size, len(texts) - i) for i in range(0, len(texts), size)]
+
+
+def test_run_config_records_effective_batch_sizes():
+    from benchmarks.embedding_bench import run_config
+
+    run = run_config("tests.test_benchmarks:CappedBackend", "float32", 0, batch_sizes=[2, 8], lengths=[8],
+                     queries=5, bulk_texts=6)
+    assert run["batch_tokens"] == 96
+    assert [(b["batch_size"], b["effective_batch_size"], b["max_batch_size"]) for b in run["bulk"]] == \
+        [(2, 2.0, 2), (8, 3.0, 3)]
@@ -0,0 +1,68 @@
+import pytest
+
+from app.embedding.chunk_store import ChunkStore
+
+
+def test_append_and_read_back(tmp_path):
+    path = str(tmp_path / "chunks")
+    store = ChunkStore(path)
+    assert len(store) == 0 and not ChunkStore.exists(path)
+
+    store.append(["alpha", "βeta ✓", ""])
+    store.append(["gamma"])
+    assert ChunkStore.exists(path)
+    assert len(store) == 4
+    assert [store[i] for i in range(4)] == ["alpha", "βeta ✓", "", "gamma"]
+    assert store[-1] == "gamma"
+    with pytest.raises(IndexError):
+        store[4]
+
+    reopened = ChunkStore(path)
+    assert list(reopened) == ["alpha", "βeta ✓", "", "gamma"]
+
+
+def test_reader_sees_only_entries_present_when_opened(tmp_path):
+    path = str(tmp_path / "chunks")
+    writer = ChunkStore(path)
+    writer.append(["one"])
+    reader = ChunkStore(path)
+    writer.append(["two"])
+    assert len(reader) == 1 and reader[0] == "one"
+
+
+def test_truncate_and_rewrite(tmp_path):
+    path = str(tmp_path / "chunks")
+    store = ChunkStore(path)
+    store.append(["a", "b", "c", "d"])
+    store.truncate(2)
+    store.append(["e"])
+    assert list(ChunkStore(path)) == ["a", "b", "e"]
+
+    store.rewrite(t for t in list(store) if t != "b")
+    assert list(store) == ["a", "e"]
+    assert list(ChunkStore(path)) == ["a", "e"]
+    store.rewrite([])
+    assert len(ChunkStore(path)) == 0
+
+
+def test_append_after_torn_write_overwrites_garbage(tmp_path):
+    path = str(tmp_path / "chunks")
+    store = ChunkStore(path)
+    store.append(["first"])
+    with open(store.blob_path, "ab") as f:
+        f.write(b"partial write without offsets")
+    store = ChunkStore(path)
+    store.append(["second"])
+    assert list(ChunkStore(path)) == ["first", "second"]
+
+
+def test_pinned_store_ignores_later_appends_and_rewrites(tmp_path):
+    path = str(tmp_path / "chunks")
+    writer = ChunkStore(path)
+    writer.append(["one", "two"])
+    pinned = ChunkStore(path).pin()
+
+    writer.append(["three"])
+    writer.rewrite(["x"])
+    assert len(pinned) == 2 and list(pinned) == ["one", "two"]
+    assert list(ChunkStore(path)) == ["x"]
@@ -0,0 +1,52 @@
+import pytest
+
+from app.ingestion.chunker import Span, chunk_text, chunk_spans, chunk_pages
+
+TEXT = (
+    "Photosynthesis converts light into chemical energy. It happens in the chloroplasts.\n\n"
+    "The Calvin cycle fixes carbon dioxide! Enzymes such as RuBisCO drive it. "
+    "Respiration releases the stored energy again."
+)
+
+
+def test_chunk_spans_are_offsets_into_text():
+    spans = chunk_spans(TEXT, chunk_size=80, overlap=10, page=3)
+    assert spans
+    for span in spans:
+        assert isinstance(span, Span)
+        assert span.page == 3
+        assert 0 < span.end - span.start <= 80
+        chunk = TEXT[span.start:span.end]
+        assert chunk == chunk.strip()
+
+
+def test_chunk_spans_snap_to_sentence_boundaries():
+    for span in chunk_spans(TEXT, chunk_size=100, overlap=0)[:-1]:
+        assert TEXT[span.end - 1] in ".!?"
+
+
+def test_chunk_spans_cover_text_without_splitting_words():
+    words = set(TEXT.split())
+    for chunk in chunk_text(TEXT, chunk_size=60, overlap=15):
+        assert set(chunk.split()) <= words
+    assert chunk_text(TEXT)[0] == TEXT.strip()
+
+
+def test_chunk_spans_respect_token_budget():
+    count_words = lambda s: len(s.split())
+    spans = chunk_spans(TEXT, chunk_size=500, overlap=0, max_tokens=8, count_tokens=count_words)
+    assert len(spans) > 1
+    assert all(count_words(TEXT[s.start:s.end]) <= 8 for s in spans)
+    assert " ".join(TEXT[s.start:s.end] for s in spans).split() == TEXT.split()
+
+
+def test_chunk_pages_keeps_chunks_within_pages():
+    pages = [(1, "First page text."), (2, ""), (3, "Third page. " * 20)]
+    chunks = list(chunk_pages(pages, chunk_size=50, overlap=5))
+    assert chunks[0] == "First page text."
+    assert all(c.startswith("Third") or c.startswith("page") for c in chunks[1:])
+
+
+def test_chunk_spans_rejects_large_overlap():
+    with pytest.raises(ValueError):
+        chunk_spans("abc", chunk_size=10, overlap=10)
@@ -0,0 +1,57 @@
+from app.ingestion.dedup import ChunkDeduplicator, minhash
+
+BASE = (
+    "Mitochondria are the powerhouse of the cell. They produce ATP through oxidative "
+    "phosphorylation, using the electron transport chain in the inner membrane to pump "
+    "protons across it. The resulting gradient drives ATP synthase, which phosphorylates "
+    "ADP. Cells with high energy demand, such as muscle and neurons, contain many "
+    "mitochondria, and defects in them cause a wide range of metabolic diseases."
+)
+OTHER = (
+    "The French Revolution began in 1789 with the storming of the Bastille in Paris. It "
+    "abolished the monarchy, proclaimed a republic and reshaped European politics for "
+    "decades, inspiring both liberal reformers and conservative reaction across the continent."
+)
+
+
+def _similarity(a, b):
+    return (minhash(a) == minhash(b)).mean()
+
+
+def test_minhash_estimates_similarity():
+    edited = BASE.replace("inner membrane", "inner mitochondrial membrane")
+    assert _similarity(BASE, BASE) == 1.0
+    assert _similarity(BASE, edited) > 0.7
+    assert _similarity(BASE, OTHER) < 0.2
+
+
+def test_exact_duplicates_are_dropped_after_normalisation():
+    dedup = ChunkDeduplicator()
+    kept = dedup.filter(["Page 3 footer", "Some text", "page 3   FOOTER"])
+    assert kept == [0, 1]
+    assert dedup.exact_dropped == 1
+    assert dedup.dropped == 1
+
+
+def test_near_duplicates_are_dropped_across_batches():
+    dedup = ChunkDeduplicator(threshold=0.8)
+    assert dedup.filter([BASE]) == [0]
+    near = BASE.replace("ATP synthase,", "ATP-synthase,").replace("cell.", "cell!")
+    assert dedup.filter([near, OTHER]) == [1]
+    assert dedup.near_dropped == 1
+
+
+def test_near_duplicate_detection_can_be_disabled():
+    dedup = ChunkDeduplicator(threshold=None)
+    near = BASE.replace("cell.", "cell!")
+    assert dedup.filter([BASE, near]) == [0, 1]
+
+
+def test_owners_of_duplicated_chunks_are_reported():
+    dedup = ChunkDeduplicator(threshold=0.8)
+    dedup.filter([BASE, "Course footer"], owner=1)
+    assert dedup.duplicated == set()
+    near = BASE.replace("cell.", "cell!")
+    assert dedup.filter(["course   FOOTER", near, OTHER, OTHER], owner=2) == [2]
+    # Repeats within the page itself are not reported
+    assert dedup.duplicated == {1}
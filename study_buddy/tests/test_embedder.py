@@ -1,2 +1,89 @@
+import subprocess
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+
+from app.embedding import embedder, model_registry
+
+
 def test_dummy():
     assert True
+
+
+def test_import_does_not_load_model():
+    code = ("import sys, app.embedding.embedder, app.embedding.retriever; "
+            "assert 'sentence_transformers' not in sys.modules and 'torch' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).parents[1])
+
+
+def test_model_loaded_once_on_first_use(monkeypatch):
+    created = []
+
+    class FakeModel:
+        max_seq_length = 512
+        tokenizer = staticmethod(lambda texts, **kwargs: {"input_ids": [[0] * len(t) for t in texts]})
+
+        def __init__(self, model_id, device=None):
+            created.append(model_id)
+
+        def encode(self, texts, **kwargs):
+            return np.ones((len(texts), 3), dtype=np.float32)
+
+    fake = types.ModuleType("sentence_transformers")
+    fake.SentenceTransformer = FakeModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+    monkeypatch.setattr(embedder, "_model", None)
+    monkeypatch.setattr(model_registry, "_models", {})
+    monkeypatch.setattr(embedder, "get_embedding_cache", lambda *args, **kwargs: None)
+
+    assert embedder.embed_text([]).size == 0
+    assert created == []
+
+    assert embedder.embed_text(["a", "b"]).shape == (2, 3)
+    embedder.warm_up()
+    assert created == [embedder.MODEL_ID]
+    assert embedder.get_model().max_seq_length == embedder.MAX_SEQ_TOKENS
+
+
+def test_shards_are_contiguous_and_cover_all_texts():
+    texts = [str(i) for i in range(100)]
+
+    shards = embedder._shards(texts, workers=4, min_size=8)
+    assert len(shards) == 4
+    assert sum(shards, []) == texts
+
+    # never split below `min_size` texts per worker
+    assert embedder._shards(texts[:10], workers=4, min_size=8) == [texts[:5], texts[5:10]]
+
+
+def test_token_batches_group_similar_lengths_within_budget():
+    lengths = [200, 5, 6, 250, 5, 7, 300]
+
+    batches = list(embedder._token_batches(lengths, budget=30))
+    assert sorted(sum(batches, [])) == list(range(len(lengths)))
+    assert batches[0] == [1, 4, 2, 5]   # shortest first, 4 x 7 tokens <= 30
+    assert [0] in batches and [6] in batches  # over-budget texts go alone
+    for batch in batches[:-1]:
+        assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= 30
+
+    assert all(len(b) <= 2 for b in embedder._token_batches(lengths, budget=1000, max_items=2))
+
+
+def test_encode_restores_input_order(monkeypatch):
+    class Tokenizer:
+        def __call__(self, texts, **kwargs):
+            return {"input_ids": [[0] * len(t) for t in texts]}
+
+    class FakeModel:
+        max_seq_length = 256
+        tokenizer = Tokenizer()
+
+        def encode(self, texts, **kwargs):
+            return np.array([[len(t)] for t in texts], dtype=np.float32)
+
+    monkeypatch.setattr(embedder, "_model", FakeModel())
+    monkeypatch.setattr(embedder, "EMBED_BATCH_TOKENS", 8)
+    texts = ["aaaa", "a", "aaaaaaaaa", "aa", "aaa"]
+    assert embedder._encode(texts)[:, 0].tolist() == [4, 1, 9, 2, 3]
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+
+from app.embedding.embedding_cache import EmbeddingCache
+
+
+class CountingEncoder:
+    def __init__(self):
+        self.texts = []
+
+    def __call__(self, texts):
+        self.texts.extend(texts)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_repeated_texts_are_encoded_once(tmp_path):
+    encode = CountingEncoder()
+    cache = EmbeddingCache("model", normalize=True, directory=str(tmp_path))
+
+    first = cache.embed(["alpha", "beta", "alpha"], encode)
+    second = cache.embed(["beta", "gamma"], encode)
+
+    assert encode.texts == ["alpha", "beta", "gamma"]
+    np.testing.assert_array_equal(first[0], first[2])
+    np.testing.assert_array_equal(first[1], second[0])
+    assert second.shape == (2, 3)
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    EmbeddingCache("model", normalize=True, directory=str(tmp_path)).embed(["alpha", "beta"], CountingEncoder())
+
+    encode = CountingEncoder()
+    cache = EmbeddingCache("model", normalize=True, directory=str(tmp_path), lru_size=1)
+    vectors = cache.embed(["beta", "alpha", "beta"], encode)
+
+    assert encode.texts == []
+    assert vectors[0].tolist() == [4.0, 1.0, 1.0]
+    assert cache.hits == 3
+
+
+def test_model_and_normalization_are_separate_namespaces(tmp_path):
+    EmbeddingCache("model", normalize=True, directory=str(tmp_path)).embed(["alpha"], CountingEncoder())
+
+    for model_id, normalize in [("model", False), ("other/model", True)]:
+        encode = CountingEncoder()
+        EmbeddingCache(model_id, normalize, directory=str(tmp_path)).embed(["alpha"], encode)
+        assert encode.texts == ["alpha"]
+
+
+def test_partial_record_is_ignored_and_overwritten(tmp_path):
+    cache = EmbeddingCache("model", normalize=True, directory=str(tmp_path))
+    cache.embed(["alpha"], CountingEncoder())
+    with open(cache.entries_path, "ab") as f:
+        f.write(b"torn")
+
+    reopened = EmbeddingCache("model", normalize=True, directory=str(tmp_path))
+    encode = CountingEncoder()
+    reopened.embed(["alpha", "beta"], encode)
+    assert encode.texts == ["beta"]
+
+    encode = CountingEncoder()
+    EmbeddingCache("model", normalize=True, directory=str(tmp_path)).embed(["alpha", "beta"], encode)
+    assert encode.texts == []
+
+
+def test_appends_from_another_cache_are_picked_up(tmp_path):
+    reader = EmbeddingCache("model", normalize=True, directory=str(tmp_path))
+    reader.embed(["alpha"], CountingEncoder())
+    EmbeddingCache("model", normalize=True, directory=str(tmp_path)).embed(["beta", "gamma"], CountingEncoder())
+
+    encode = CountingEncoder()
+    vectors = reader.embed(["gamma", "beta", "alpha"], encode)
+    assert encode.texts == []
+    assert vectors[:, 0].tolist() == [5.0, 4.0, 5.0]
+
+
+def test_memory_only_texts_are_not_written_to_disk(tmp_path):
+    cache = EmbeddingCache("model", normalize=True, directory=str(tmp_path))
+    cache.embed(["chunk"], CountingEncoder())
+    size = os.path.getsize(cache.entries_path)
+
+    encode = CountingEncoder()
+    cache.embed(["question", "question"], encode, disk=False)
+    cache.embed(["question", "chunk"], encode, disk=False)
+    assert encode.texts == ["question"]
+    assert os.path.getsize(cache.entries_path) == size
+
+    encode = CountingEncoder()
+    EmbeddingCache("model", normalize=True, directory=str(tmp_path)).embed(["question"], encode)
+    assert encode.texts == ["question"]
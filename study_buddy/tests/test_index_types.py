@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.embedding import indexer
+from app.embedding.retriever import search_params
+from config.settings import IVF_NPROBE
+
+
+def unit_vectors(count, seed=1):
+    vectors = np.random.default_rng(seed).standard_normal((count, 384)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(kind, vectors, pca_dim=0):
+    index = indexer._new_index(pca_dim, kind, nlist=8)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf"])
+def test_index_type_round_trips(kind):
+    index = build(kind, unit_vectors(400))
+    assert indexer.index_type(index) == kind
+    assert indexer.index_precision(index) == indexer.VECTOR_PRECISION
+
+
+@pytest.mark.parametrize("kind,pca_dim", [("hnsw", 0), ("ivf", 0), ("ivf", 32)])
+def test_removal_keeps_positions_aligned(kind, pca_dim):
+    vectors = unit_vectors(400)
+    index = build(kind, vectors, pca_dim)
+
+    removed = {0, 5, 399}
+    if kind == "ivf":
+        indexer._remove_from_ivf(index, removed)
+        rebuilt = index
+    else:
+        rebuilt = indexer._without(index, removed)
+    kept = [i for i in range(400) if i not in removed]
+    assert rebuilt.ntotal == len(kept)
+    assert indexer.index_type(rebuilt) == kind
+
+    params = search_params(rebuilt, nprobe=8)
+    _, ids = rebuilt.search(vectors[kept[:20]], 1, params=params)
+    assert ids[:, 0].tolist() == list(range(20))
+    # Vectors added afterwards continue at the new end
+    rebuilt.add(vectors[:1])
+    assert rebuilt.search(vectors[:1], 1, params=params)[1][0, 0] == len(kept)
+
+
+def test_search_params_match_index_type():
+    vectors = unit_vectors(400)
+    assert search_params(build("flat", vectors)) is None
+    assert search_params(build("hnsw", vectors), ef_search=99).efSearch == 99
+    assert search_params(build("ivf", vectors)).nprobe == IVF_NPROBE
+    params = search_params(build("ivf", vectors, pca_dim=32), nprobe=3)
+    assert isinstance(params, faiss.SearchParametersPreTransform)
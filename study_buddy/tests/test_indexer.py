@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.embedding import indexer, retriever
+from app.embedding.chunk_store import ChunkStore
+from app.embedding.tombstones import file_identity, read_tombstones
+from app.embedding.vector_log import VectorLog
+
+
+def unit_vectors(count, seed=1):
+    vectors = np.random.default_rng(seed).standard_normal((count, 384)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(params=["flat", "hnsw"])
+def store(request, tmp_path, monkeypatch):
+    """An empty FAISS store in tmp_path, shared by the indexer and the retriever."""
+    paths = {"FAISS_INDEX_PATH": "index.bin", "FAISS_LOG_PATH": "index.log", "FAISS_MANIFEST_PATH": "manifest.json",
+             "TOMBSTONES_PATH": "removed", "CHUNK_STORE_PATH": "chunks"}
+    for name, file in paths.items():
+        monkeypatch.setattr(indexer, name, str(tmp_path / file))
+        monkeypatch.setattr(retriever, name, str(tmp_path / file))
+    monkeypatch.setattr(indexer, "VECTOR_PRECISION", "float32")
+    monkeypatch.setattr(indexer, "index", indexer._new_index(index_type=request.param), raising=False)
+    monkeypatch.setattr(indexer, "chunk_store", ChunkStore(str(tmp_path / "chunks")))
+    monkeypatch.setattr(indexer, "key_store", ChunkStore(str(tmp_path / "keys")))
+    monkeypatch.setattr(indexer, "vector_log", VectorLog(str(tmp_path / "index.log")))
+    monkeypatch.setattr(indexer, "checkpointed", 0)
+    monkeypatch.setattr(indexer, "generation", 0)
+    monkeypatch.setattr(indexer, "removed", set())
+    monkeypatch.setattr(indexer, "key_positions", None)
+    monkeypatch.setattr(indexer, "VECTOR_DB", "faiss")
+    monkeypatch.setattr(retriever, "VECTOR_DB", "faiss")
+    return tmp_path
+
+
+def nearest(snapshot, vectors):
+    _, ids = snapshot.index.search(vectors, 1, params=retriever.search_params(snapshot.index))
+    return [snapshot.chunks[i] for i in ids[:, 0]]
+
+
+def test_removal_is_filtered_until_the_checkpoint_drops_it(store):
+    vectors = unit_vectors(6)
+    indexer.index_text_chunks(["a0", "a1", "b0"], vectors[:3], ["a:1", "a:1", "b:1"])
+    indexer.index_text_chunks(["c0", "c1", "d0"], vectors[3:], ["c:1", "c:1", "d:1"])  # logged
+    checkpoint = file_identity(indexer.FAISS_INDEX_PATH)
+
+    indexer.remove_chunks({"a:1", "c:1"})
+    # Only tombstones are written: neither index.bin nor the stores change
+    assert file_identity(indexer.FAISS_INDEX_PATH) == checkpoint
+    assert read_tombstones(indexer.TOMBSTONES_PATH)[1].tolist() == [0, 1, 3, 4]
+    assert len(indexer.chunk_store) == 6
+
+    snapshot = retriever._load_snapshot()
+    assert snapshot.generation == indexer.generation
+    assert set(nearest(snapshot, vectors)) == {"b0", "d0"}
+    assert nearest(snapshot, vectors[[2, 5]]) == ["b0", "d0"]
+
+    # Removing keys that are already gone changes nothing
+    generation = indexer.generation
+    indexer.remove_chunks({"a:1"})
+    assert indexer.generation == generation
+
+    assert indexer.checkpoint() == 3
+    assert read_tombstones(indexer.TOMBSTONES_PATH) is None
+    assert list(indexer.chunk_store) == ["b0", "d0"] and list(indexer.key_store) == ["b:1", "d:1"]
+    assert indexer.index.ntotal == 2
+
+    snapshot = retriever._load_snapshot()
+    assert nearest(snapshot, vectors[[2, 5]]) == ["b0", "d0"]
+
+    # Keys are found again after the positions moved
+    indexer.remove_chunks({"d:1"})
+    assert read_tombstones(indexer.TOMBSTONES_PATH)[1].tolist() == [1]
+
+
+def test_tombstones_of_another_index_are_not_applied(store):
+    vectors = unit_vectors(3)
+    indexer.index_text_chunks(["a0", "b0", "c0"], vectors, ["a:1", "b:1", "c:1"])
+    indexer.remove_chunks({"a:1"})
+    tombstones = (store / "removed").read_bytes()
+    indexer.checkpoint()
+
+    # A checkpoint that stopped after writing index.bin
+    (store / "removed").write_bytes(tombstones)
+    snapshot = retriever._load_snapshot()
+    assert snapshot.generation is None
+    assert nearest(snapshot, vectors[1:]) == ["b0", "c0"]
+
+
+def test_start_finishes_a_checkpoint_interrupted_after_the_stores(store, monkeypatch):
+    vectors = unit_vectors(4)
+    indexer.index_text_chunks(["a0", "b0"], vectors[:2], ["a:1", "b:1"])
+    indexer.index_text_chunks(["c0", "d0"], vectors[2:], ["c:1", "d:1"])  # logged
+    indexer.remove_chunks({"b:1"})
+    indexer._compact(vectors=False)  # then the process died
+
+    monkeypatch.setattr(indexer, "index", indexer._new_index(), raising=False)
+    indexer._load_faiss_store()
+    assert indexer.index.ntotal == len(indexer.chunk_store) == 3
+    assert read_tombstones(indexer.TOMBSTONES_PATH) is None and VectorLog(indexer.FAISS_LOG_PATH).size() == 0
+    assert nearest(retriever._load_snapshot(), vectors[[0, 2, 3]]) == ["a0", "c0", "d0"]
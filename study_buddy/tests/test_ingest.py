@@ -0,0 +1,82 @@
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.ingestion import cache, documents, ingest
+from app.ingestion.pdf_reader import PageText
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """In-memory vector store; PDFs are tuples of page texts with chunks separated by "|"."""
+    indexed = []  # (key, chunk)
+
+    @contextmanager
+    def open_pdf(source):
+        yield "\n".join(source).encode()
+
+    def remove_chunks(keys):
+        indexed[:] = [(key, chunk) for key, chunk in indexed if key not in keys]
+
+    monkeypatch.setattr(documents, "DOCUMENTS_PATH", str(tmp_path / "documents.json"))
+    monkeypatch.setattr(cache, "INGEST_CACHE_ENABLED", False)
+    monkeypatch.setattr(ingest, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(ingest, "open_pdf", open_pdf)
+    monkeypatch.setattr(ingest, "iter_pdf_pages",
+                        lambda source: (PageText(i, text) for i, text in enumerate(source, start=1)))
+    monkeypatch.setattr(ingest, "chunk_page", lambda text, page_number: text.split("|"))
+    monkeypatch.setattr(ingest, "embed_bulk", lambda texts: np.zeros((len(texts), 4), dtype=np.float32))
+    monkeypatch.setattr(ingest, "index_text_chunks",
+                        lambda chunks, embeddings, keys: indexed.extend(zip(keys, chunks)))
+    monkeypatch.setattr(ingest, "remove_chunks", remove_chunks)
+    return indexed
+
+
+def chunks_of(indexed):
+    return sorted(chunk for _, chunk in indexed)
+
+
+def test_duplicate_kept_on_a_removed_page_is_restored(store):
+    ingest.ingest_pdf(("intro|shared footer", "body|shared footer"), doc_id="notes.pdf")
+    assert chunks_of(store) == ["body", "intro", "shared footer"]
+
+    # Page 1 changes and loses the footer page 2 relied on
+    ingest.ingest_pdf(("new intro", "body|shared footer"), doc_id="notes.pdf")
+    assert chunks_of(store) == ["body", "new intro", "shared footer"]
+    page_two = documents.page_hash("body|shared footer")
+    assert ("notes.pdf:" + page_two, "shared footer") in store
+
+    # Nothing is re-indexed once the dependency is gone
+    assert ingest.ingest_pdf(("new intro", "body|shared footer"), doc_id="notes.pdf") == 0
+
+
+def test_unchanged_dependent_page_is_kept_while_its_source_stays(store):
+    ingest.ingest_pdf(("intro|shared footer", "body|shared footer"), doc_id="notes.pdf")
+    # A new page is appended; pages 1 and 2 are untouched
+    assert ingest.ingest_pdf(("intro|shared footer", "body|shared footer", "more"), doc_id="notes.pdf") == 1
+    assert chunks_of(store) == ["body", "intro", "more", "shared footer"]
+
+
+def test_failed_ingestion_removes_the_chunks_it_indexed(store, monkeypatch):
+    monkeypatch.setattr(ingest, "INGEST_BATCH_SIZE", 2)
+    calls = []
+
+    def failing_embed(texts):
+        calls.append(texts)
+        if len(calls) == 2:
+            raise RuntimeError("model crashed")
+        return np.zeros((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(ingest, "embed_bulk", failing_embed)
+    pdf = ("a1|a2", "b1|b2", "c1")
+    with pytest.raises(RuntimeError, match="model crashed"):
+        ingest.ingest_pdf(pdf, doc_id="notes.pdf")
+    assert store == []
+    assert documents.load_manifest() == {}
+
+    monkeypatch.setattr(ingest, "embed_bulk", lambda texts: np.zeros((len(texts), 4), dtype=np.float32))
+    assert ingest.ingest_pdf(pdf, doc_id="notes.pdf") == 5
+    assert chunks_of(store) == ["a1", "a2", "b1", "b2", "c1"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.ingestion import cache
+from app.ingestion.cache import CacheWriter, ingestion_key, load_cached
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "INGEST_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "INGEST_CACHE_ENABLED", True)
+    return tmp_path
+
+
+def test_ingestion_key_depends_on_bytes_and_settings():
+    key = ingestion_key(b"pdf", chunk_size=500, model="m")
+    assert key == ingestion_key(b"pdf", model="m", chunk_size=500)
+    assert key != ingestion_key(b"pdf2", chunk_size=500, model="m")
+    assert key != ingestion_key(b"pdf", chunk_size=400, model="m")
+
+
+def test_cache_round_trip():
+    key = ingestion_key(b"pdf")
+    assert load_cached(key) is None
+
+    embeddings = np.random.rand(3, 4).astype(np.float32)
+    with CacheWriter(key, model="m") as writer:
+        pages = list(writer.record_pages([(1, "page one"), (2, "page two")]))
+        writer.add(["a", "b"], embeddings[:2], [1, 1])
+        writer.add(["c"], embeddings[2:], [2])
+    assert pages == [(1, "page one"), (2, "page two")]
+
+    cached = load_cached(key)
+    assert cached.pages == ["page one", "page two"]
+    assert cached.chunk_pages == [1, 1, 2]
+    assert cached.chunks == ["a", "b", "c"]
+    np.testing.assert_array_equal(cached.embeddings, embeddings)
+
+
+def test_failed_ingestion_is_not_cached(cache_dir):
+    key = ingestion_key(b"pdf")
+    with pytest.raises(RuntimeError):
+        with CacheWriter(key) as writer:
+            writer.add(["a"], np.zeros((1, 4), dtype=np.float32), [1])
+            raise RuntimeError("embedding failed")
+    assert load_cached(key) is None
+    assert list(cache_dir.iterdir()) == []
+
+
+def test_incomplete_ingestion_is_not_cached():
+    key = ingestion_key(b"pdf")
+    with CacheWriter(key) as writer:
+        writer.add(["a"], np.zeros((1, 4), dtype=np.float32), [1])
+        writer.mark_incomplete()
+    assert load_cached(key) is None
@@ -0,0 +1,63 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+from app.embedding import model_registry
+
+
+@pytest.fixture
+def fake_sentence_transformers(monkeypatch):
+    loaded = []
+
+    class FakeModel:
+        max_seq_length = 256
+
+        def __init__(self, model_id, device=None):
+            time.sleep(0.01)  # widen the window for concurrent loads
+            loaded.append((model_id, device))
+            self.active = 0
+            self.overlapped = False
+            self.tokenizer = lambda texts, **kwargs: {"input_ids": [[0] * len(t) for t in texts]}
+
+        def encode(self, texts, **kwargs):
+            self.active += 1
+            self.overlapped |= self.active > 1
+            time.sleep(0.001)
+            self.active -= 1
+            return [[1.0] for _ in texts]
+
+    fake = types.ModuleType("sentence_transformers")
+    fake.SentenceTransformer = FakeModel
+    monkeypatch.setitem(sys.modules, "sentence_transformers", fake)
+    monkeypatch.setattr(model_registry, "_models", {})
+    return loaded
+
+
+def test_one_instance_per_model_and_device(fake_sentence_transformers):
+    threads = [threading.Thread(target=model_registry.get_sentence_transformer, args=("m",)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    shared = model_registry.get_sentence_transformer("m")
+    assert model_registry.get_sentence_transformer("m", device="cpu") is shared
+    assert model_registry.get_sentence_transformer("m", device="mps") is not shared
+    assert fake_sentence_transformers == [("m", "cpu"), ("m", "mps")]
+
+
+def test_shared_model_serializes_calls_and_passes_attributes(fake_sentence_transformers):
+    model = model_registry.get_sentence_transformer("m")
+    model.max_seq_length = 128
+    assert model.max_seq_length == 128
+
+    threads = [threading.Thread(target=model.encode, args=(["a", "b"],)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not model.overlapped
+    assert model.tokenizer(["abc"])["input_ids"] == [[0, 0, 0]]
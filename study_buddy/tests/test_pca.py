@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from app.embedding.pca import pca_report, pick_dim
+
+
+def low_rank_vectors(count=400, rank=8, dim=64, seed=0):
+    rng = np.random.default_rng(seed)
+    basis = rng.standard_normal((rank, dim))
+    return (rng.standard_normal((count, rank)) @ basis + 0.01 * rng.standard_normal((count, dim))).astype(np.float32)
+
+
+def test_report_variance_is_cumulative():
+    variance = [option.variance for option in pca_report(low_rank_vectors(), dims=range(1, 65))]
+    assert np.all(np.diff(variance) >= -1e-6)
+    assert variance[7] > 0.99
+    assert variance[-1] == pytest.approx(1.0)
+
+
+def test_report_and_pick_dim_find_the_intrinsic_rank():
+    report = pca_report(low_rank_vectors(), dims=(4, 8, 16, 64))
+    assert [option.dim for option in report] == [4, 8, 16, 64]
+    assert report[-1].recall == pytest.approx(1.0)
+    assert report[0].recall < report[1].recall
+
+    assert pick_dim(report, variance=0.99) == 8
+    assert pick_dim(report, recall=0.8) == 8
+    assert pick_dim(report, variance=1.01) is None
+
+
+def test_index_applies_pca_to_stored_and_query_vectors():
+    pytest.importorskip("faiss")
+    from app.embedding import indexer
+
+    vectors = low_rank_vectors(dim=384)
+    index = indexer._new_index(pca_dim=16)
+    index.train(vectors)
+    index.add(vectors)
+
+    assert indexer.index_pca_dim(index) == 16
+    assert indexer.index_precision(index) == indexer.VECTOR_PRECISION
+    _, ids = index.search(vectors[:20], 1)
+    assert (ids[:, 0] == np.arange(20)).all()
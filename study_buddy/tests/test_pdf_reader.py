@@ -0,0 +1,50 @@
+from app.ingestion.pdf_reader import iter_pdf_pages, extract_text_from_pdf, open_pdf
+from benchmarks.synthetic import make_pdf, synthetic_pages
+
+
+def test_iter_pdf_pages_yields_numbered_pages():
+    pdf = make_pdf(["first page", "second page", "third page"])
+    pages = list(iter_pdf_pages(pdf))
+    assert [p.page_number for p in pages] == [1, 2, 3]
+    assert [p.text.strip() for p in pages] == ["first page", "second page", "third page"]
+
+
+def test_extract_text_from_pdf_concatenates_pages():
+    pdf = make_pdf(["alpha", "beta"])
+    assert extract_text_from_pdf(pdf) == "".join(p.text for p in iter_pdf_pages(pdf))
+
+
+def test_parallel_extraction_preserves_page_order(monkeypatch):
+    monkeypatch.setattr("app.ingestion.pdf_reader.PDF_EXTRACT_SHARD_PAGES", 2)
+    pdf = make_pdf([f"page {n}" for n in range(1, 8)])
+    serial = list(iter_pdf_pages(pdf, workers=1))
+    parallel = list(iter_pdf_pages(pdf, workers=3))
+    assert parallel == serial
+    assert [p.page_number for p in parallel] == list(range(1, 8))
+
+
+def test_iter_pdf_pages_accepts_path(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.ingestion.pdf_reader.PDF_EXTRACT_SHARD_PAGES", 1)
+    pdf = make_pdf(["from disk", "second", "third"])
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf)
+    assert list(iter_pdf_pages(str(path))) == list(iter_pdf_pages(pdf))
+    assert list(iter_pdf_pages(path, workers=2)) == list(iter_pdf_pages(pdf))
+
+
+def test_open_pdf_maps_path_without_copy(tmp_path):
+    pdf = make_pdf(["mapped"])
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(pdf)
+    with open_pdf(str(path)) as buffer:
+        assert not isinstance(buffer, bytes)
+        assert buffer[:len(pdf)] == pdf
+        assert [p.text.strip() for p in iter_pdf_pages(buffer)] == ["mapped"]
+    with open_pdf(pdf) as buffer:
+        assert buffer is pdf
+
+
+def test_synthetic_pages_round_trip():
+    pages = synthetic_pages(3, words_per_page=60)
+    extracted = [p.text for p in iter_pdf_pages(make_pdf(pages))]
+    assert [e.split() for e in extracted] == [p.split() for p in pages]
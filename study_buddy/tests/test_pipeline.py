@@ -0,0 +1,114 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.ingestion import cache, documents, ingest, pipeline
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """In-memory vector store; "PDFs" are text files with pages separated by form feeds."""
+    indexed = []  # (key, chunk)
+
+    def extract(path):
+        with open(path) as f:
+            text = f.read()
+        return cache.file_digest(text.encode()), text.split("\f")
+
+    def remove_chunks(keys):
+        indexed[:] = [(key, chunk) for key, chunk in indexed if key not in keys]
+
+    monkeypatch.setattr(documents, "DOCUMENTS_PATH", str(tmp_path / "documents.json"))
+    monkeypatch.setattr(cache, "INGEST_CACHE_ENABLED", False)
+    monkeypatch.setattr(ingest, "DEDUP_ENABLED", True)
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(pipeline, "_extract_file", extract)
+    monkeypatch.setattr(pipeline, "chunk_page", lambda text, page_number: text.split("|"))
+    monkeypatch.setattr(pipeline, "embed_bulk", lambda texts: np.zeros((len(texts), 4), dtype=np.float32))
+    monkeypatch.setattr(pipeline, "index_text_chunks",
+                        lambda chunks, embeddings, keys: indexed.extend(zip(keys, chunks)))
+    monkeypatch.setattr(pipeline, "remove_chunks", remove_chunks)
+    monkeypatch.setattr(pipeline, "EMBED_BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(pipeline, "INDEX_WRITE_BATCH_SIZE", 1)
+    return indexed
+
+
+def write_pdfs(root, files):
+    for name, pages in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\f".join(pages))
+    return pipeline.find_pdfs(str(root))
+
+
+def test_same_named_files_are_separate_documents_in_path_order(tmp_path, store):
+    root = tmp_path / "course"
+    paths = write_pdfs(root, {"a/notes.pdf": ["alpha|beta"], "b/notes.pdf": ["gamma"], "intro.pdf": ["delta"]})
+
+    assert pipeline.ingest_paths(paths, workers=2, root=pipeline.ingest_root(str(root))) == 4
+    assert [chunk for _, chunk in store] == ["alpha", "beta", "gamma", "delta"]
+    assert set(documents.load_manifest()) == {os.path.join("a", "notes.pdf"), os.path.join("b", "notes.pdf"),
+                                              "intro.pdf"}
+
+    # Re-running changes nothing: neither file counts as a revision of the other
+    assert pipeline.ingest_paths(paths, workers=2, root=str(root)) == 0
+    assert len(store) == 4
+
+
+def test_a_document_id_is_ingested_once_per_run(tmp_path, store):
+    paths = write_pdfs(tmp_path, {"notes.pdf": ["alpha"]})
+    assert pipeline.ingest_paths(paths * 2, workers=1, root=str(tmp_path)) == 1
+    assert store == [("notes.pdf:" + documents.page_hash("alpha"), "alpha")]
+
+
+def test_failure_keeps_finished_documents_and_rolls_back_partial_ones(tmp_path, store, monkeypatch):
+    paths = write_pdfs(tmp_path, {"1.pdf": ["a1|a2"], "2.pdf": ["b1|b2|b3"]})
+    writes = []
+
+    def failing_index(chunks, embeddings, keys):
+        writes.append(chunks)
+        if len(writes) == 3:
+            raise RuntimeError("disk full")
+        store.extend(zip(keys, chunks))
+
+    monkeypatch.setattr(pipeline, "index_text_chunks", failing_index)
+    with pytest.raises(RuntimeError, match="disk full"):
+        pipeline.ingest_paths(paths, workers=1, root=str(tmp_path))
+    assert sorted(chunk for _, chunk in store) == ["a1", "a2"]
+    assert list(documents.load_manifest()) == ["1.pdf"]
+
+    monkeypatch.setattr(pipeline, "index_text_chunks",
+                        lambda chunks, embeddings, keys: store.extend(zip(keys, chunks)))
+    assert pipeline.ingest_paths(paths, workers=1, root=str(tmp_path)) == 3
+    assert sorted(chunk for _, chunk in store) == ["a1", "a2", "b1", "b2", "b3"]
+
+
+def test_ingest_root():
+    assert pipeline.ingest_root(os.path.join("docs", "**", "*.pdf")) == "docs"
+    assert pipeline.ingest_root(os.path.join("docs", "week*", "notes.pdf")) == "docs"
+    assert pipeline.ingest_root(os.path.join("docs", "notes.pdf")) == "docs"
+    assert pipeline.ingest_root("*.pdf") == "."
+
+
+
+def test_chunking_failure_rolls_back_like_other_stages(tmp_path, store, monkeypatch):
+    paths = write_pdfs(tmp_path, {"1.pdf": ["a1|a2|a3"], "2.pdf": ["b1|b2"], "3.pdf": ["c1"]})
+
+    def chunk_page(text, page_number):
+        if text.startswith("b"):
+            raise ValueError("bad page")
+        return text.split("|")
+
+    monkeypatch.setattr(pipeline, "chunk_page", chunk_page)
+    with pytest.raises(ValueError, match="bad page"):
+        pipeline.ingest_paths(paths, workers=1, root=str(tmp_path))
+    assert sorted(chunk for _, chunk in store) == ["a1", "a2", "a3"]
+    assert list(documents.load_manifest()) == ["1.pdf"]
+
+    monkeypatch.setattr(pipeline, "chunk_page", lambda text, page_number: text.split("|"))
+    assert pipeline.ingest_paths(paths, workers=1, root=str(tmp_path)) == 3
+    assert sorted(chunk for _, chunk in store) == ["a1", "a2", "a3", "b1", "b2", "c1"]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from app.embedding.quantization import SAMPLE_TEXTS, check_agreement
+
+
+class FakeModel:
+    def __init__(self, noise=0.0):
+        self.noise = noise
+
+    def encode(self, texts, normalize_embeddings=False, **kwargs):
+        vectors = np.array([[len(t), t.count("e"), t.count(" ") + 1.0] for t in texts])
+        vectors = vectors + self.noise * np.arange(len(texts))[:, None]
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors
+
+
+def test_identical_models_agree():
+    report = check_agreement(SAMPLE_TEXTS, FakeModel(), FakeModel())
+    assert report.samples == len(SAMPLE_TEXTS)
+    assert report.mean_cosine == pytest.approx(1.0)
+    assert report.min_cosine == pytest.approx(1.0)
+
+
+def test_disagreement_is_reported():
+    report = check_agreement(SAMPLE_TEXTS, FakeModel(), FakeModel(noise=20.0))
+    assert report.min_cosine < report.mean_cosine < 1.0
+
+
+def test_quantize_model_replaces_linear_layers():
+    torch = pytest.importorskip("torch")
+    from app.embedding.quantization import quantize_model
+
+    model = torch.nn.Sequential(torch.nn.Linear(8, 4), torch.nn.ReLU())
+    quantized = quantize_model(model)
+    assert isinstance(model[0], torch.nn.Linear)  # original left untouched
+    assert type(quantized[0]) is not torch.nn.Linear
@@ -0,0 +1,148 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.embedding import retriever
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    vectors = np.eye(4, 384, dtype=np.float32)
+    index = faiss.IndexFlatL2(384)
+    index.add(vectors)
+    chunks = ["zero", "one", "two", "three"]
+    embedded = []
+
+    def embed_queries(texts):
+        embedded.append(list(texts))
+        return vectors[[chunks.index(t) for t in texts]]
+
+    monkeypatch.setattr(retriever, "VECTOR_DB", "faiss")
+    monkeypatch.setattr(retriever.index_handle, "_snapshot", retriever.Snapshot(1, index, chunks))
+    monkeypatch.setattr(retriever.index_handle, "reload_seconds", 0)
+    monkeypatch.setattr(retriever, "embed_queries", embed_queries)
+    monkeypatch.setattr(retriever, "embed_query", lambda text: embed_queries([text])[0])
+    return embedded
+
+
+def test_batch_embeds_once_and_returns_results_per_query(corpus):
+    results = retriever.retrieve_relevant_chunks_batch(["two", "zero", "three"], top_k=1)
+    assert results == [["two"], ["zero"], ["three"]]
+    assert corpus == [["two", "zero", "three"]]
+
+
+def test_batch_matches_single_query_results(corpus):
+    queries = ["one", "three"]
+    batch = retriever.retrieve_relevant_chunks_batch(queries, top_k=3)
+    assert batch == [retriever.retrieve_relevant_chunks(q, top_k=3) for q in queries]
+
+
+def test_batch_drops_missing_neighbours_and_handles_no_queries(corpus):
+    assert retriever.retrieve_relevant_chunks_batch([]) == []
+    assert len(retriever.retrieve_relevant_chunks_batch(["one"], top_k=10)[0]) == 4
+
+
+def test_batch_raises_when_embedding_fails(corpus, monkeypatch):
+    monkeypatch.setattr(retriever, "embed_queries", lambda texts: np.array([]))
+    with pytest.raises(RuntimeError):
+        retriever.retrieve_relevant_chunks_batch(["one"])
+
+
+def test_handle_picks_up_a_new_generation(tmp_path, monkeypatch):
+    from app.embedding.chunk_store import ChunkStore
+    from app.embedding.manifest import write_manifest
+    from app.embedding.vector_log import VectorLog
+
+    paths = {"FAISS_INDEX_PATH": "index.bin", "FAISS_LOG_PATH": "index.log",
+             "FAISS_MANIFEST_PATH": "manifest.json", "CHUNK_STORE_PATH": "chunks"}
+    for name, file in paths.items():
+        monkeypatch.setattr(retriever, name, str(tmp_path / file))
+    vectors = np.eye(3, 384, dtype=np.float32)
+
+    index = faiss.IndexFlatL2(384)
+    index.add(vectors[:1])
+    faiss.write_index(index, retriever.FAISS_INDEX_PATH)
+    ChunkStore(retriever.CHUNK_STORE_PATH).append(["zero"])
+    write_manifest(retriever.FAISS_MANIFEST_PATH, generation=1, vectors=1)
+
+    handle = retriever.IndexHandle(reload_seconds=0.01)
+    first = handle.get()
+    assert first.generation == 1 and first.index.ntotal == 1
+
+    # The indexer logs two more vectors and announces generation 2
+    ChunkStore(retriever.CHUNK_STORE_PATH).append(["one", "two"])
+    VectorLog(retriever.FAISS_LOG_PATH).append(1, vectors[1:])
+    write_manifest(retriever.FAISS_MANIFEST_PATH, generation=2, vectors=3)
+
+    deadline = time.monotonic() + 5
+    while handle.get().generation != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    current = handle.get()
+    assert current.generation == 2 and current.index.ntotal == 3
+    assert current.chunks[2] == "two"
+    # Only the new log records were read; the checkpoint is shared
+    assert current.index.base is first.index.base
+    assert current.index.search(vectors[2:], 1)[1][0, 0] == 2
+    # The earlier snapshot is untouched for searches still using it
+    assert first.index.ntotal == 1
+
+    # After a checkpoint index.bin is read again
+    index.add(vectors[1:])
+    faiss.write_index(index, retriever.FAISS_INDEX_PATH + ".tmp")
+    os.replace(retriever.FAISS_INDEX_PATH + ".tmp", retriever.FAISS_INDEX_PATH)
+    VectorLog(retriever.FAISS_LOG_PATH).clear()
+    handle.reload()
+    checkpointed = handle.get().index
+    assert checkpointed.base is not first.index.base
+    assert checkpointed.ntotal == 3 and checkpointed.tail.ntotal == 0
+
+
+@pytest.mark.parametrize("description", ["Flat", "SQ8", "HNSW32", "IVF4,SQ8", "PCA32,Flat"])
+def test_mapped_index_searches_like_a_read_one(tmp_path, monkeypatch, description):
+    from app.embedding.vector_log import VectorLog
+
+    path, log_path = str(tmp_path / "index.bin"), str(tmp_path / "index.log")
+    vectors = np.random.default_rng(0).standard_normal((200, 384)).astype(np.float32)
+    index = faiss.index_factory(384, description)
+    index.train(vectors)
+    index.add(vectors)
+    faiss.write_index(index, path)
+
+    mapped = retriever.read_index(path, log_path, mmap=True, prefault=True)
+    read = retriever.read_index(path, log_path, mmap=False)
+    assert mapped.ntotal == read.ntotal == 200
+    assert np.array_equal(mapped.search(vectors[:5], 3)[1], read.search(vectors[:5], 3)[1])
+
+    # Logged vectors are searched alongside the mapped index
+    logged = np.random.default_rng(1).standard_normal((2, 384)).astype(np.float32)
+    VectorLog(log_path).append(200, logged)
+    mapped = retriever.read_index(path, log_path, mmap=True)
+    assert mapped.ntotal == 202
+    params = retriever.search_params(mapped)
+    assert mapped.search(logged, 1, params=params)[1][:, 0].tolist() == [200, 201]
+    assert np.array_equal(mapped.search(vectors[:5], 1, params=params)[1],
+                          read.search(vectors[:5], 1, params=params)[1])
+
+
+def test_snapshot_keeps_its_chunks_when_the_store_is_rewritten(tmp_path, monkeypatch):
+    from app.embedding.chunk_store import ChunkStore
+
+    paths = {"FAISS_INDEX_PATH": "index.bin", "FAISS_LOG_PATH": "index.log",
+             "FAISS_MANIFEST_PATH": "manifest.json", "CHUNK_STORE_PATH": "chunks"}
+    for name, file in paths.items():
+        monkeypatch.setattr(retriever, name, str(tmp_path / file))
+    index = faiss.IndexFlatL2(384)
+    index.add(np.eye(3, 384, dtype=np.float32))
+    faiss.write_index(index, retriever.FAISS_INDEX_PATH)
+    store = ChunkStore(retriever.CHUNK_STORE_PATH)
+    store.append(["zero", "one", "two"])
+
+    snapshot = retriever._load_snapshot()
+    # A removal compacts the store before the snapshot's first search
+    store.rewrite(["two"])
+    _, ids = snapshot.index.search(np.eye(3, 384, dtype=np.float32), 1)
+    assert [snapshot.chunks[i] for i in ids[:, 0]] == ["zero", "one", "two"]
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.embedding.vector_log import VectorLog
+
+faiss = pytest.importorskip("faiss")
+
+
+def vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, 8)).astype(np.float32)
+
+
+def test_replay_adds_only_vectors_missing_from_the_index(tmp_path):
+    log = VectorLog(str(tmp_path / "index.log"))
+    first, second = vectors(3, seed=1), vectors(2, seed=2)
+    log.append(0, first)
+    log.append(3, second)
+    assert len(log) == 5
+
+    # Checkpointed part-way through: only the second record is new
+    index = faiss.IndexFlatL2(8)
+    index.add(first)
+    assert log.replay(index) == 2
+    assert np.array_equal(index.reconstruct_n(0, 5), np.vstack([first, second]))
+
+    # Replaying again is a no-op
+    assert log.replay(index) == 0
+    assert index.ntotal == 5
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    path = tmp_path / "index.log"
+    log = VectorLog(str(path))
+    log.append(0, vectors(3))
+    log.append(3, vectors(2))
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 5)
+
+    index = faiss.IndexFlatL2(8)
+    assert log.replay(index) == 3
+
+
+def test_log_not_continuing_the_index_is_skipped(tmp_path):
+    log = VectorLog(str(tmp_path / "index.log"))
+    log.append(10, vectors(2))
+    index = faiss.IndexFlatL2(8)
+    assert log.replay(index) == 0
+
+    log.clear()
+    assert log.size() == 0 and len(log) == 0
+
+
+def test_repair_lets_appends_follow_a_torn_record(tmp_path):
+    path = tmp_path / "index.log"
+    log = VectorLog(str(path))
+    first, torn, later = vectors(3, seed=1), vectors(2, seed=2), vectors(4, seed=3)
+    log.append(0, first)
+    log.append(3, torn)
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 20)
+
+    index = faiss.IndexFlatL2(8)
+    assert log.replay(index) == 3
+    assert log.repair() > 0
+    assert log.repair() == 0
+    log.append(3, later)
+
+    replayed = faiss.IndexFlatL2(8)
+    assert log.replay(replayed) == 7
+    assert np.array_equal(replayed.reconstruct_n(0, 7), np.vstack([first, later]))
+
+
+def test_replay_continues_from_the_last_position(tmp_path):
+    log = VectorLog(str(tmp_path / "index.log"))
+    first, second = vectors(3, seed=1), vectors(2, seed=2)
+    log.append(0, first)
+
+    index = faiss.IndexFlatL2(8)
+    assert log.replay(index) == 3
+    position = log.position
+    assert position == log.size()
+
+    log.append(3, second)
+    assert log.replay(index, position) == 2
+    assert np.array_equal(index.reconstruct_n(0, 5), np.vstack([first, second]))
+    assert log.position == log.size()
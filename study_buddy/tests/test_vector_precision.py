@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+faiss = pytest.importorskip("faiss")
+
+from app.embedding import indexer
+
+
+def unit_vectors(count, seed=1):
+    vectors = np.random.default_rng(seed).standard_normal((count, 384)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("precision", ["float32", "float16", "int8"])
+def test_new_index_uses_configured_precision(monkeypatch, precision):
+    monkeypatch.setattr(indexer, "VECTOR_PRECISION", precision)
+    index = indexer._new_index()
+    assert indexer.index_precision(index) == precision
+
+
+@pytest.mark.parametrize("precision", ["float16", "int8"])
+def test_quantized_index_finds_nearest_neighbours(monkeypatch, precision):
+    monkeypatch.setattr(indexer, "VECTOR_PRECISION", precision)
+    index = indexer._new_index()
+    vectors = unit_vectors(500)
+
+    # a tiny first batch must still produce usable int8 scales
+    indexer._train(index, vectors[:1])
+    index.add(vectors)
+
+    _, ids = index.search(vectors[:50], 1)
+    assert (ids[:, 0] == np.arange(50)).mean() >= 0.98
+
+
+@pytest.fixture
+def float32_store(tmp_path, monkeypatch):
+    """A float32 flat store of 600 chunks whose embeddings are `unit_vectors(600)`."""
+    from app.embedding.chunk_store import ChunkStore
+    from app.embedding.vector_log import VectorLog
+
+    vectors = unit_vectors(600)
+    chunks = [f"chunk {i}" for i in range(len(vectors))]
+    embedded = []
+
+    def embed_bulk(texts):
+        embedded.extend(texts)
+        return vectors[[chunks.index(text) for text in texts]]
+
+    monkeypatch.setattr(indexer, "VECTOR_PRECISION", "float32")
+    index = indexer._new_index()
+    index.add(vectors)
+    for name, file in {"FAISS_INDEX_PATH": "index.bin", "FAISS_MANIFEST_PATH": "manifest.json"}.items():
+        monkeypatch.setattr(indexer, name, str(tmp_path / file))
+    monkeypatch.setattr(indexer, "chunk_store", ChunkStore(str(tmp_path / "chunks")))
+    monkeypatch.setattr(indexer, "key_store", ChunkStore(str(tmp_path / "keys")))
+    monkeypatch.setattr(indexer, "vector_log", VectorLog(str(tmp_path / "index.log")))
+    monkeypatch.setattr(indexer, "index", index, raising=False)
+    monkeypatch.setattr(indexer, "checkpointed", index.ntotal)
+    monkeypatch.setattr(indexer, "embed_bulk", embed_bulk)
+    monkeypatch.setattr(indexer, "EMBED_BULK_BATCH_SIZE", 128)
+    indexer.chunk_store.append(chunks)
+    indexer.key_store.append([f"doc.pdf:{i}" for i in range(len(chunks))])
+    return vectors, embedded
+
+
+@pytest.mark.parametrize("precision,kind,pca_dim", [
+    ("float16", "flat", 0), ("int8", "flat", 0), ("int8", "ivf", 0), ("float16", "flat", 32), ("int8", "ivf", 32),
+])
+def test_rebuild_converts_the_index_and_keeps_chunks_aligned(monkeypatch, float32_store, precision, kind, pca_dim):
+    from app.embedding.retriever import search_params
+
+    vectors, embedded = float32_store
+    monkeypatch.setattr(indexer, "VECTOR_PRECISION", precision)
+    monkeypatch.setattr(indexer, "FAISS_INDEX_TYPE", kind)
+    monkeypatch.setattr(indexer, "VECTOR_PCA_DIM", pca_dim)
+
+    assert indexer.rebuild_index() == 600
+    rebuilt = faiss.read_index(indexer.FAISS_INDEX_PATH)
+    assert (indexer.index_precision(rebuilt), indexer.index_type(rebuilt), indexer.index_pca_dim(rebuilt)) == \
+        (precision, kind, pca_dim)
+    assert rebuilt.ntotal == len(indexer.chunk_store) == len(indexer.key_store) == 600
+    # Every chunk was embedded in store order (plus a training sample if needed)
+    assert embedded[-600:] == [f"chunk {i}" for i in range(600)]
+
+    # Searching with a chunk's embedding finds that chunk and its key
+    _, ids = rebuilt.search(vectors, 1, params=search_params(rebuilt, nprobe=64))
+    found = [(indexer.chunk_store[i], indexer.key_store[i]) for i in ids[:, 0]]
+    expected = [(f"chunk {i}", f"doc.pdf:{i}") for i in range(600)]
+    assert np.mean([a == b for a, b in zip(found, expected)]) >= 0.95
@@ -1,9 +1,22 @@
 from fastapi import FastAPI, Request
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from typing import List
-from app.embedding.retriever import retrieve_relevant_chunks
+import asyncio
+from app.embedding.embedder import warm_up
+from app.embedding.retriever import retrieve_relevant_chunks, retrieve_relevant_chunks_batch
+from config.settings import EMBED_WARMUP
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Every request embeds its query; load the model before serving
+    if EMBED_WARMUP:
+        await asyncio.to_thread(warm_up)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 class ToolInput(BaseModel):
@@ -13,6 +26,15 @@ class ToolInput(BaseModel):
 @app.post("/run")
 async def run_tool(request: Request):
     body = await request.json()
+    queries = body.get("input", {}).get("queries")
+    if queries:
+        # Many questions at once: one embedding batch and one index search
+        return {
+            "output": {
+                "results": retrieve_relevant_chunks_batch(queries)
+            }
+        }
+
     query = body.get("input", {}).get("query", "")
     if not query:
         return {"error": "Missing query"}